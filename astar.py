@@ -1,56 +1,114 @@
 from heapq import heappush, heappop
+from itertools import count
 from schedule import Schedule
-from utils import pretty_print_timetable
-from check_constraints import check_optional_constraints
+from timetable import Timetable
+from stats import SearchStats
+from progress import Progress
+from transposition import TranspositionTable
+from schedule_data import ScheduleData
+from budget import Budget
+
+EXPANDED_STATE_BYTES = 130 # array header, parent hash and longer tuple of an expanded state, besides its cells
 
 class AStar:
-    
+
+    @staticmethod
+    def table_with_memory(megabytes: float, schedule_data: ScheduleData):
+        """Returns a table fitting in a memory budget, counting the cells kept for every expanded state"""
+        nr_cells = len(schedule_data.day_names) * len(schedule_data.interval_names) * len(schedule_data.classroom_names)
+        return TranspositionTable.with_memory(megabytes, EXPANDED_STATE_BYTES + 4 * nr_cells)
+
     @staticmethod
-    def algorithm(start: Schedule, input_file: str):
-        frontier = []
-        heappush(frontier, (start.heuristic(), start))
-    
-        discovered = {start.state_hash(): (None, 0, start.heuristic())}
+    def algorithm(start: Schedule, stats: SearchStats = None, progress: Progress = None,
+                  table: TranspositionTable = None, budget: Budget = None):
+        # heap entries are (f, insertion counter, g, h, state): ties are broken by the counter,
+        # so states are never compared and the costs are computed once, when the state is pushed
+        tie_breaker = count()
+        start_hash = start.state_hash()
+        start_heuristic = start.heuristic()
+        frontier = [(start_heuristic, next(tie_breaker), 0, start_heuristic, start)]
+
+        # (best known cost from the start, heuristic, parent hash, compact cells once expanded) by state hash,
+        # unbounded unless a capped table is given; an evicted state is forgotten, it can be expanded again
+        table = table if table is not None else TranspositionTable()
+        table.store(start_hash, (0, start_heuristic, None, None))
 
-        
         best_partial_solution = None
         best_partial_cost = float('inf')
+        expanded = 0 # number of states popped from the frontier
+        stats = stats if stats is not None else SearchStats()
+        progress = progress if progress is not None else Progress()
 
         while frontier:
-            current_cost, current = heappop(frontier)
-            current_total_cost = current_cost + current.heuristic()
-            print(pretty_print_timetable(current.days, input_file))
+            total_cost, _, current_cost, current_heuristic, current = heappop(frontier)
+            current_hash = current.state_hash()
+            # skipping the entries of states already expanded or reached again with a smaller cost
+            known = table.lookup(current_hash)
+            if known is not None and (known[3] is not None or current_cost > known[0]):
+                continue
+            # an expanded state is not changed anymore, its cells are kept without copying them
+            parent_hash = known[2] if known is not None else None
+            table.store(current_hash, (current_cost, current_heuristic, parent_hash, current.timetable.cells))
+            expanded += 1
+            progress.expanded(current, expanded, best_partial_cost)
 
-           
-            if current_total_cost < best_partial_cost and current.is_valid():
+            # the best partial solution is the valid state closest to a goal
+            if current_heuristic < best_partial_cost and current.is_valid():
                 best_partial_solution = current
-                best_partial_cost = current_total_cost
+                best_partial_cost = current_heuristic
+                # the checkpoint records the soft cost, the same cost as the other solvers
+                progress.improved(current, current.evaluator.soft_cost)
 
             if current.is_goal():
-               
+
                 best_partial_solution = current
-                best_partial_cost = current_total_cost
+                best_partial_cost = current_heuristic
                 print("Goal found!")
                 break  # Can stop if the goal state is found
 
-            for neighbour in current.successors():
-                print(check_optional_constraints(neighbour.days, neighbour.specs))
-                neighbour_hash = neighbour.state_hash()
-                new_cost = discovered[current.state_hash()][1] + current.transition_cost(neighbour)
-                total_cost = new_cost + neighbour.heuristic()
+            # an exhausted budget returns the best partial solution found so far
+            if budget is not None and budget.exhausted(stats):
+                print("Budget exhausted!")
+                break
+
+            moves = current.successor_moves()
+            stats.states_expanded += 1
+            stats.successors_generated += len(moves)
+            for move in moves:
+                # the move is checked in place and the neighbour materialized only if pushed on the frontier
+                current.apply_move(move)
+                neighbour_hash = current.state_hash()
+                neighbour_valid = current.is_valid()
+                current.undo_move(move)
+                if not neighbour_valid:
+                    continue
+                known = table.lookup(neighbour_hash)
+                if known is not None and known[3] is not None:
+                    continue
 
-                
-                if neighbour.is_valid() and (neighbour_hash not in discovered or new_cost < discovered[neighbour_hash][1]):
-                    discovered[neighbour_hash] = (current.state_hash(), new_cost, total_cost)
-                    heappush(frontier, (total_cost, neighbour))
+                new_cost = current_cost + current.move_transition_cost(move)
+                if known is None or new_cost < known[0]:
+                    neighbour = current.materialize(move)
+                    stats.states_materialized += 1
+                    progress.pushed(neighbour)
+                    # the heuristic of a state reached again is reused from the table
+                    neighbour_heuristic = neighbour.heuristic() if known is None else known[1]
+                    table.store(neighbour_hash, (new_cost, neighbour_heuristic, current_hash, None))
+                    heappush(frontier, (new_cost + neighbour_heuristic, next(tie_breaker), new_cost,
+                                        neighbour_heuristic, neighbour))
 
         path_to_best_partial = []
         if best_partial_solution:
-            current = best_partial_solution
-            while current:
-                path_to_best_partial.append(current)
-                parent_hash = discovered[current.state_hash()][0]
-                current = parent_hash and current.get_state_by_hash(parent_hash)
+            # the ancestors of an expanded state are expanded, their compact cells are in the table;
+            # with a capped table the path starts at the first ancestor which was evicted
+            path_to_best_partial.append(best_partial_solution)
+            entry = table.entries.get(best_partial_solution.state_hash())
+            parent = table.entries.get(entry[2]) if entry is not None and entry[2] is not None else None
+            while parent is not None and parent[3] is not None:
+                state = Schedule(start.schedule_data, start.random)
+                state.set_timetable(Timetable(start.schedule_data, parent[3]))
+                path_to_best_partial.append(state)
+                parent = table.entries.get(parent[2]) if parent[2] is not None else None
             path_to_best_partial.reverse()  # Reverse path to start from initial state
 
-        return path_to_best_partial, best_partial_cost  # Return the path and cost of the best partial solution
\ No newline at end of file
+        return path_to_best_partial, best_partial_cost, expanded  # Return the path and cost of the best partial solution
@@ -0,0 +1,99 @@
+from schedule_data import ScheduleData
+from timetable import EMPTY
+from evaluator import MAX_PROFESSOR_HOURS
+
+try:
+    import numpy as np
+except ImportError: # numpy is optional, only the batch scorer needs it
+    np = None
+
+
+class BatchScorer:
+    """
+    Scores many timetables of the same problem at once with numpy: the timetables are stacked in a
+    [states, day, interval, classroom] tensor of assignment ids (EMPTY for an empty cell) and every
+    constraint is counted for all of them by array reductions, with the same results as the evaluator
+    """
+    def __init__(self, schedule_data: ScheduleData):
+        if np is None:
+            raise ImportError('numpy is required for batch scoring, install it with pip install numpy')
+        self.schedule_data = schedule_data
+        self.nr_days = len(schedule_data.day_names)
+        self.nr_intervals = len(schedule_data.interval_names)
+        self.nr_slots = self.nr_days * self.nr_intervals
+        self.nr_classrooms = len(schedule_data.classroom_names)
+        self.nr_professors = len(schedule_data.professor_names)
+        self.nr_courses = len(schedule_data.course_names)
+
+        self.capacities = np.array(schedule_data.capacities, dtype=np.int64)
+        self.targets = np.array([schedule_data.courses[course] for course in schedule_data.course_names],
+                                dtype=np.int64)
+        self.course_allowed_in_classroom = np.array(schedule_data.course_allowed_in_classroom, dtype=bool)
+        self.professor_teaches_course = np.array(schedule_data.professor_teaches_course, dtype=bool)
+        # [professor, slot] penalties of the violated preferences
+        self.preference_penalties = np.array(schedule_data.preference_penalties, dtype=np.int64)
+        # [professor, day occupancy bitset] violated '!Pauza > N' constraints, 0 for professors without one
+        self.gap_penalties = np.array([penalties if penalties is not None else [0] * (1 << self.nr_intervals)
+                                       for penalties in schedule_data.gap_penalties], dtype=np.int64)
+        self.interval_bits = 1 << np.arange(self.nr_intervals)
+
+    def stack(self, states: list):
+        """Returns the [states, day, interval, classroom] tensor of the timetables of some states"""
+        cells = np.array([state.timetable.cells for state in states], dtype=np.int32)
+        return cells.reshape(len(states), self.nr_days, self.nr_intervals, self.nr_classrooms)
+
+    def stack_moves(self, state, moves: list):
+        """Returns the tensor of the successors of a state reached by some moves, without materializing them"""
+        cells = np.tile(np.array(state.timetable.cells, dtype=np.int32), (len(moves), 1))
+        for index, move in enumerate(moves):
+            for cell, _, new in move.writes:
+                cells[index, cell] = new
+        return cells.reshape(len(moves), self.nr_days, self.nr_intervals, self.nr_classrooms)
+
+    def score(self, timetables):
+        """Returns the arrays of the hard and soft constraints violated by every stacked timetable"""
+        timetables = np.asarray(timetables)
+        nr_states = timetables.shape[0]
+        assignments = timetables.reshape(nr_states, self.nr_slots, self.nr_classrooms)
+        occupied = assignments != EMPTY
+        professors, courses = np.divmod(np.where(occupied, assignments, 0), self.nr_courses)
+        classrooms = np.arange(self.nr_classrooms)
+        slots = np.arange(self.nr_slots)[:, None]
+        state_ids = np.arange(nr_states)[:, None, None]
+
+        # course taught in a classroom not allowing it, professor not teaching the course
+        hard = (occupied & ~self.course_allowed_in_classroom[courses, classrooms]).sum(axis=(1, 2))
+        hard += (occupied & ~self.professor_teaches_course[professors, courses]).sum(axis=(1, 2))
+
+        # professor teaching in 2 classrooms in the same interval, every extra classroom is a violation
+        occupancy = np.bincount(((state_ids * self.nr_slots + slots) * self.nr_professors + professors)[occupied],
+                                minlength=nr_states * self.nr_slots * self.nr_professors)
+        occupancy = occupancy.reshape(nr_states, -1)
+        hard += np.maximum(occupancy - 1, 0).sum(axis=1)
+
+        # professor teaching more than MAX_PROFESSOR_HOURS intervals
+        hours = np.bincount((state_ids * self.nr_professors + professors)[occupied],
+                            minlength=nr_states * self.nr_professors).reshape(nr_states, self.nr_professors)
+        hard += (hours > MAX_PROFESSOR_HOURS).sum(axis=1)
+
+        # course whose classrooms don't seat all its students
+        seats = np.broadcast_to(self.capacities, assignments.shape)
+        coverage = np.bincount((state_ids * self.nr_courses + courses)[occupied], weights=seats[occupied],
+                               minlength=nr_states * self.nr_courses).reshape(nr_states, self.nr_courses)
+        hard += (coverage < self.targets).sum(axis=1)
+
+        soft = (self.preference_penalties[professors, slots] * occupied).sum(axis=(1, 2))
+
+        # breaks longer than accepted, from the bitset of the intervals taught by every professor in every day
+        teaching = occupancy.reshape(nr_states, self.nr_days, self.nr_intervals, self.nr_professors) > 0
+        days = np.einsum('sdip,i->sdp', teaching.astype(np.int64), self.interval_bits)
+        soft += self.gap_penalties[np.arange(self.nr_professors), days].sum(axis=(1, 2))
+        return hard, soft
+
+    def score_states(self, states: list):
+        """Returns the arrays of the hard and soft costs of some states"""
+        return self.score(self.stack(states))
+
+    def score_moves(self, state, moves: list):
+        """Returns the arrays of the hard and soft costs of the successors of a state reached by some moves"""
+        return self.score(self.stack_moves(state, moves))
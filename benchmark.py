@@ -0,0 +1,220 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from orar import parse_input_file
+from schedule_data import ScheduleData
+from schedule import Schedule, INITIAL_STATES
+from hc import HillClimbing
+from astar import AStar
+from csp import CSP
+from bnb import BranchAndBound
+from sa import SimulatedAnnealing
+from tabu import TabuSearch
+from memetic import MemeticAlgorithm
+from milp import MILP
+from stats import SearchStats
+from progress import Progress
+from check_constraints import check_mandatory_constraints, check_optional_constraints
+
+# metrics compared against the baseline, with the absolute slack added to the relative threshold
+# so that noise on very small values is not reported as a regression
+COMPARED_METRICS = {
+    'wall_time': 0.05,
+    'cpu_time': 0.05,
+    'peak_rss_kb': 1024,
+    'peak_traced_kb': 256,
+    'hard_constraints': 0,
+    'soft_constraints': 0,
+}
+
+
+def run_algorithm(algorithm: str, schedule_data: ScheduleData, seed: int, max_restarts: int, init: str, stats: SearchStats):
+    """Runs an algorithm on a compiled input and returns its best state"""
+    if algorithm == 'astar':
+        initial_state = Schedule(schedule_data, random.Random(seed))
+        initial_state.create_state(init)
+        stats.construction_retries += initial_state.construction_retries
+        path, _, _ = AStar.algorithm(initial_state, stats, Progress())
+        best_state = path[-1] if path else None
+    elif algorithm == 'csp':
+        best_state, _ = CSP.algorithm(schedule_data, stats, Progress())
+    elif algorithm in ('sa', 'tabu'):
+        initial_state = Schedule(schedule_data, random.Random(seed))
+        initial_state.create_state(init)
+        stats.construction_retries += initial_state.construction_retries
+        solver = SimulatedAnnealing if algorithm == 'sa' else TabuSearch
+        best_state, _, _ = solver.algorithm(initial_state, stats, Progress())
+    elif algorithm == 'memetic':
+        # as many generations as hill climbing restarts
+        best_state, _, _ = MemeticAlgorithm.algorithm(schedule_data, stats, Progress(), generations=max_restarts,
+                                                      seed=seed, init=init)
+    elif algorithm == 'milp':
+        best_state, _, _, _ = MILP.algorithm(schedule_data, stats, Progress(), 'cbc')
+    elif algorithm == 'bnb':
+        # same node limit as the restarts of hill climbing, so a run ends on the bigger inputs
+        best_state, _, _, _ = BranchAndBound.algorithm(schedule_data, stats, Progress(), max_restarts * 100)
+    else:
+        best_state, _, _, _ = HillClimbing.random_restart_hill_climbing(
+            time.time(), schedule_data, max_restarts=max_restarts, seed=seed, stats=stats,
+            progress=Progress(), init=init)
+    return best_state
+
+
+def run_case(algorithm: str, input_file: str, seed: int, max_restarts: int, trace_memory: bool, init: str):
+    """Runs an algorithm on an input and returns the measured metrics"""
+    input_file = os.path.abspath(input_file)
+    stats = SearchStats()
+    if trace_memory:
+        tracemalloc.start()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+
+    # the model is loaded from the cache of the working directory, before moving to the temporary one
+    schedule_data = parse_input_file(input_file)
+    # the algorithms print timetables and write output.txt in the working directory
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir, open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        os.chdir(work_dir)
+        try:
+            best_state = run_algorithm(algorithm, schedule_data, seed, max_restarts, init, stats)
+        finally:
+            os.chdir(cwd)
+
+    result = {
+        'wall_time': time.perf_counter() - wall_start,
+        'cpu_time': time.process_time() - cpu_start,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    if trace_memory:
+        result['peak_traced_kb'] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    result.update(stats.as_dict())
+    if best_state is not None:
+        result['hard_constraints'] = check_mandatory_constraints(best_state.days, schedule_data.specs)
+        result['soft_constraints'] = check_optional_constraints(best_state.days, schedule_data.specs)
+    return result
+
+
+def _case_process(queue: multiprocessing.Queue, *args):
+    """Entry point of the process running a single case"""
+    try:
+        queue.put(('ok', run_case(*args)))
+    except Exception as error:
+        queue.put(('error', repr(error)))
+
+
+def run_isolated(algorithm: str, input_file: str, seed: int, max_restarts: int, trace_memory: bool, init: str,
+                 timeout: float):
+    """Runs a case in its own process, so memory is measured separately and a stuck search can be stopped"""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_case_process,
+                              args=(queue, algorithm, input_file, seed, max_restarts, trace_memory, init))
+    process.start()
+    try:
+        status, result = queue.get(timeout=timeout)
+    except Exception:
+        status, result = 'timeout', {}
+    process.join(1)
+    if process.is_alive():
+        process.kill()
+        process.join()
+    if status == 'error':
+        result = {'error': result}
+    result.update(algorithm=algorithm, input=os.path.basename(input_file), seed=seed, status=status)
+    return result
+
+
+def summarize(runs: list):
+    """Averages the metrics of every (algorithm, input) over the seeds"""
+    summary = {}
+    for run in runs:
+        key = f"{run['algorithm']}/{run['input']}"
+        summary.setdefault(key, {'runs': 0, 'failed': 0})
+        summary[key]['runs'] += 1
+        if run['status'] != 'ok':
+            summary[key]['failed'] += 1
+            continue
+        for metric in COMPARED_METRICS:
+            if metric in run:
+                summary[key].setdefault(metric, []).append(run[metric])
+    for metrics in summary.values():
+        for metric in COMPARED_METRICS:
+            if metric in metrics:
+                metrics[metric] = sum(metrics[metric]) / len(metrics[metric])
+    return summary
+
+
+def compare(summary: dict, baseline: dict, threshold: float):
+    """Returns the regressions of a summary compared to the baseline summary"""
+    regressions = []
+    for key, baseline_metrics in baseline.items():
+        if key not in summary:
+            continue
+        metrics = summary[key]
+        if metrics['failed'] > baseline_metrics['failed']:
+            regressions.append(f"{key}: {metrics['failed']} failed runs, baseline {baseline_metrics['failed']}")
+        for metric, slack in COMPARED_METRICS.items():
+            if metric not in metrics or metric not in baseline_metrics:
+                continue
+            limit = baseline_metrics[metric] * (1 + threshold) + slack
+            if metrics[metric] > limit:
+                regressions.append(f'{key}: {metric} {metrics[metric]:.3f}, baseline {baseline_metrics[metric]:.3f}')
+    return regressions
+
+
+def parse_arguments():
+    """Parses the command line arguments"""
+    parser = argparse.ArgumentParser(description='Benchmarks the search algorithms over the input files')
+    parser.add_argument('--inputs', nargs='+', default=sorted(glob.glob('inputs/*.yaml')), help='yaml input files')
+    parser.add_argument('--algorithms', nargs='+', choices=['astar', 'hc', 'csp', 'bnb', 'sa', 'tabu', 'memetic', 'milp'], default=['astar', 'hc'])
+    parser.add_argument('--seeds', nargs='+', type=int, default=[0, 1, 2])
+    parser.add_argument('--max-restarts', type=int, default=500, help='restarts of hill climbing')
+    parser.add_argument('--init', choices=INITIAL_STATES, default='random', help='constructor of the initial states')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds allowed for every run')
+    parser.add_argument('--tracemalloc', action='store_true', help='also measure the peak of traced python memory')
+    parser.add_argument('--report', default='bench_report.json', help='json report of the runs')
+    parser.add_argument('--baseline', default=None, help='json report to compare against')
+    parser.add_argument('--save-baseline', default=None, help='also store the report as a baseline in this file')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative regression, e.g. 0.2 for 20%%')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+
+    runs = []
+    for input_file in args.inputs:
+        for algorithm in args.algorithms:
+            for seed in args.seeds:
+                run = run_isolated(algorithm, input_file, seed, args.max_restarts, args.tracemalloc, args.init,
+                                   args.timeout)
+                print(f"{run['algorithm']:5} {run['input']:30} seed {seed:<6} {run['status']:7} "
+                      f"{run.get('wall_time', 0):8.2f}s  soft {run.get('soft_constraints', '-')}  "
+                      f"hard {run.get('hard_constraints', '-')}", flush=True)
+                runs.append(run)
+
+    report = {'threshold': args.threshold, 'runs': runs, 'summary': summarize(runs)}
+    with open(args.report, 'w') as file:
+        json.dump(report, file, indent=4)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as file:
+            json.dump(report, file, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+        regressions = compare(report['summary'], baseline['summary'], args.threshold)
+        for regression in regressions:
+            print('REGRESSION', regression)
+        if regressions:
+            sys.exit(1)
+        print('No regressions compared to', args.baseline)
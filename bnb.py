@@ -0,0 +1,195 @@
+import sys
+import time
+from schedule import Schedule
+from schedule_data import ScheduleData
+from csp import CSP
+from evaluator import MAX_PROFESSOR_HOURS
+from stats import SearchStats
+from progress import Progress
+from budget import Budget
+from check_constraints import check_optional_constraints
+
+
+class BranchAndBound:
+    """
+    Anytime depth first branch and bound over the placements of the courses, same search space as CSP,
+    minimizing the violated preferences of the professors
+    """
+
+    @staticmethod
+    def algorithm(schedule_data: ScheduleData, stats: SearchStats = None, progress: Progress = None,
+                  max_nodes: int = None, incumbent: Schedule = None, budget: Budget = None):
+        """
+        Returns the best schedule found (None if there is none), its cost, the proven lower bound and
+        the history of (seconds, incumbent cost, lower bound); the cost equals the bound when the search is complete.
+        A valid incumbent (e.g. a greedy initial state) lets the search prune from the start. The search stops
+        like with the node limit when the budget is exhausted. The bound starts at the root bound and rises to the
+        smallest bound of the root children still open as their subtrees close.
+        The optimum is proven over the minimal placements only: a course stops being placed once its students
+        are seated, while an extra placement could still fill a '!Pauza' break and lower the cost.
+        """
+        stats = stats if stats is not None else SearchStats()
+        progress = progress if progress is not None else Progress()
+
+        state = Schedule(schedule_data)
+        state.initialize_all_data()
+        search = {
+            'neighbours': CSP.neighbours(schedule_data),
+            'last_cells': [-1] * len(schedule_data.course_names),
+            'best_state': incumbent,
+            'best_cost': incumbent.evaluator.soft_cost if incumbent is not None else sys.maxsize,
+            'lower_bound': 0,
+            'max_nodes': max_nodes,
+            'budget': budget,
+            'start_time': time.time(),
+            'history': [],
+        }
+
+        if incumbent is not None:
+            # the initial incumbent is checkpointed, even if the search never beats it
+            progress.improved(incumbent, search['best_cost'])
+            BranchAndBound.__report(search, progress)
+        complete = BranchAndBound.__branch(state, search, stats, progress, True)
+        if complete and search['best_state'] is not None:
+            # every subtree was explored or pruned, the incumbent is optimal
+            search['lower_bound'] = search['best_cost']
+            BranchAndBound.__report(search, progress)
+        best_state = search['best_state']
+        best_cost = check_optional_constraints(best_state.timetable, schedule_data.specs)\
+            if best_state is not None else None
+        return best_state, best_cost, search['lower_bound'], search['history']
+
+    @staticmethod
+    def lower_bound(state: Schedule, uncovered: list, domains: dict):
+        """
+        Admissible bound on the cost of any completion: the preferences already violated, plus for every
+        uncovered course the cheapest way to fill its fewest intervals still needed, where a professor
+        gives at most one interval per slot and no more than the hours left
+        """
+        data = state.schedule_data
+        nr_classrooms = state.timetable.nr_classrooms
+        hours_left = [MAX_PROFESSOR_HOURS - hours for hours in state.evaluator.professor_hours]
+        # the breaks of a partial schedule can still be filled, only the slot preferences are kept in the bound
+        bound = state.evaluator.soft_cost - state.evaluator.gap_cost
+        for course in uncovered:
+            _, _, needed_intervals = CSP.bounds(state, course, domains[course])
+            if needed_intervals is None:
+                return None
+            # distinct slots of every professor, grouped by the penalty of teaching in them
+            slots = {}
+            for cell, professor in domains[course]:
+                slot = cell // nr_classrooms
+                slots.setdefault(data.preference_penalties[professor][slot], {}).setdefault(professor, set()).add(slot)
+            # filling the needed intervals with the cheapest penalties first
+            filled = 0
+            professor_slots = {}
+            for penalty in sorted(slots):
+                for professor, penalty_slots in slots[penalty].items():
+                    professor_slots[professor] = professor_slots.get(professor, 0) + len(penalty_slots)
+                capacity = sum(min(hours_left[professor], nr_slots) for professor, nr_slots in professor_slots.items())
+                taken = min(needed_intervals, capacity) - filled
+                bound += taken * penalty
+                filled += taken
+                if filled == needed_intervals:
+                    break
+        return bound
+
+    def __report(search: dict, progress: Progress):
+        """Records the incumbent and the lower bound in the history of the search"""
+        search['history'].append((time.time() - search['start_time'], search['best_cost'], search['lower_bound']))
+        progress.bounded(search['best_cost'], search['lower_bound'])
+
+    def __branch(state: Schedule, search: dict, stats: SearchStats, progress: Progress, root: bool = False):
+        """Explores the subtree of a partial schedule, returns False if it was cut by the node limit or the budget"""
+        data = state.schedule_data
+        uncovered = CSP.uncovered(state)
+        if len(uncovered) == 0:
+            cost = state.evaluator.soft_cost
+            if cost < search['best_cost']:
+                search['best_cost'] = cost
+                search['best_state'] = CSP.solution(state)
+                progress.improved(search['best_state'], cost)
+                BranchAndBound.__report(search, progress)
+            return True
+
+        if search['max_nodes'] is not None and stats.states_expanded >= search['max_nodes']:
+            return False
+        if search['budget'] is not None and search['budget'].exhausted(stats):
+            return False
+        stats.states_expanded += 1
+        progress.expanded(state, stats.states_expanded, search['best_cost'])
+
+        domains = CSP.domains(state, uncovered, search['last_cells'])
+        if not CSP.consistent(state, uncovered, domains, search['neighbours']):
+            return True
+        bound = BranchAndBound.lower_bound(state, uncovered, domains)
+        if root:
+            search['lower_bound'] = bound
+        if bound >= search['best_cost']:
+            return True
+
+        course = CSP.select_course(uncovered, domains, search['neighbours'])
+        course_name = data.course_names[course]
+        students_left = state.students_left[course_name]
+        nr_classrooms = state.timetable.nr_classrooms
+
+        def value_cost(value):
+            cell, professor = value
+            capacity = data.capacities[cell % nr_classrooms]
+            # cheapest values first, so good incumbents are found early
+            return (data.preference_penalties[professor][cell // nr_classrooms],
+                    max(0, capacity - students_left), -capacity, cell, professor)
+
+        values = sorted(domains[course], key=value_cost)
+        stats.successors_generated += len(values)
+        last_cells = search['last_cells']
+        previous_cell = last_cells[course]
+
+        # the lower bound of the run is the smallest bound of the root children still open, it rises as they close
+        child_bounds = None
+        if root:
+            child_bounds = []
+            for cell, professor in values:
+                day, interval, classroom = state.timetable.slot(cell)
+                state.assign_course(course_name, day, interval, classroom, data.professor_names[professor])
+                last_cells[course] = cell
+                child_bounds.append(BranchAndBound.node_bound(state, search))
+                state.unassign_course(cell)
+            BranchAndBound.__tighten(search, progress, bound, child_bounds)
+
+        complete = True
+        for index, (cell, professor) in enumerate(values):
+            # every child is pruned by the bound recomputed after its assignment: the cells of a course are placed
+            # in increasing order, so a dearer value doesn't rule out the cheaper ones left for the next cells
+            day, interval, classroom = state.timetable.slot(cell)
+            state.assign_course(course_name, day, interval, classroom, data.professor_names[professor])
+            last_cells[course] = cell
+            child_complete = BranchAndBound.__branch(state, search, stats, progress)
+            state.unassign_course(cell)
+            complete = child_complete and complete
+            if root and child_complete:
+                child_bounds[index] = sys.maxsize
+                BranchAndBound.__tighten(search, progress, bound, child_bounds)
+            if not complete or search['best_cost'] <= search['lower_bound']:
+                break
+        last_cells[course] = previous_cell
+        return complete
+
+    @staticmethod
+    def node_bound(state: Schedule, search: dict):
+        """Returns the lower bound of a partial schedule, its cost if it is complete, sys.maxsize if it is a dead end"""
+        uncovered = CSP.uncovered(state)
+        if len(uncovered) == 0:
+            return state.evaluator.soft_cost
+        domains = CSP.domains(state, uncovered, search['last_cells'])
+        if not CSP.consistent(state, uncovered, domains, search['neighbours']):
+            return sys.maxsize
+        bound = BranchAndBound.lower_bound(state, uncovered, domains)
+        return bound if bound is not None else sys.maxsize
+
+    def __tighten(search: dict, progress: Progress, root_bound: int, child_bounds: list):
+        """Raises the lower bound of the run to the smallest bound of the open root children, or the incumbent"""
+        lower_bound = max(root_bound, min(search['best_cost'], min(child_bounds)))
+        if lower_bound > search['lower_bound']:
+            search['lower_bound'] = lower_bound
+            BranchAndBound.__report(search, progress)
@@ -0,0 +1,82 @@
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from stats import SearchStats
+
+
+class Budget:
+    """
+    Wall clock and evaluation limits of a search; the evaluations are the successors (moves or values)
+    counted in the stats of the search
+    """
+    def __init__(self, time_limit: float = None, max_evals: int = None):
+        # an absolute deadline, so the budget can be shipped to worker processes
+        self.deadline = time.time() + time_limit if time_limit is not None else None
+        self.max_evals = max_evals
+        # event set by the parent process to stop the searches of its worker processes
+        self.stop = None
+        # evaluations of all the tasks of a parallel run, and the ones of this task already added to them
+        self.shared_evals = None
+        self.reported_evals = 0
+
+    def exhausted(self, stats: SearchStats):
+        """Returns True when the search has to stop and return its best state"""
+        if self.stop is not None and self.stop.is_set():
+            return True
+        if self.max_evals is not None:
+            evals = stats.successors_generated
+            if self.shared_evals is not None:
+                with self.shared_evals.get_lock():
+                    self.shared_evals.value += evals - self.reported_evals
+                    evals = self.shared_evals.value
+                self.reported_evals = stats.successors_generated
+            if evals >= self.max_evals:
+                return True
+        return self.deadline is not None and time.time() >= self.deadline
+
+
+# stop event of the pool of a worker process, set by the parent process to stop the tasks of the run,
+# and the evaluations counted by all the tasks of the run
+_worker_stop = None
+_worker_evals = None
+
+def start_workers(workers: int, initializer, initargs: tuple, spent_evals: int = 0):
+    """
+    Returns a process pool whose workers run initializer(*initargs) once, and the stop event they share;
+    the tasks share the deadline and the evaluations of the budget, starting from the ones already spent
+    """
+    stop = multiprocessing.Event()
+    evals = multiprocessing.Value('q', spent_evals)
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(stop, evals, initializer, initargs))
+    return executor, stop
+
+def stop_workers(executor: ProcessPoolExecutor, stop):
+    """
+    Stops the running tasks of a pool, which return at their next budget check, cancels the outstanding ones
+    and waits for the workers, so the pool is closed before the interpreter exits
+    """
+    stop.set()
+    executor.shutdown(wait=True, cancel_futures=True)
+
+def _init_worker(stop, evals, initializer, initargs: tuple):
+    """Stores the stop event and the evaluation counter received once by a worker process and runs the initializer"""
+    global _worker_stop, _worker_evals
+    _worker_stop = stop
+    _worker_evals = evals
+    initializer(*initargs)
+
+def worker_stopped():
+    """Returns True in a worker process when the parent process stopped the run"""
+    return _worker_stop.is_set()
+
+def worker_budget(budget: Budget):
+    """
+    Returns the budget of a task run in a worker process, exhausted when the parent process stops the run
+    or when all the tasks of the run evaluated max_evals successors
+    """
+    budget = budget if budget is not None else Budget()
+    budget.stop = _worker_stop
+    budget.shared_evals = _worker_evals
+    budget.reported_evals = 0
+    return budget
@@ -2,6 +2,7 @@ import yaml
 import argparse
 import sys
 from utils import read_yaml_file, get_profs_initials, pretty_print_timetable
+from timetable import as_days_dict
 
 
 ##################### MACROURI #####################
@@ -100,6 +101,8 @@ def check_mandatory_constraints(timetable : {str : {(int, int) : {str : (str, st
     Se verifică dacă orarul generat respectă cerințele obligatorii pentru a fi un orar valid.
     '''
 
+    timetable = as_days_dict(timetable)
+
     constrangeri_incalcate = 0
 
     acoperire_target = timetable_specs[MATERII]
@@ -155,6 +158,8 @@ def check_optional_constraints(timetable : {str : {(int, int) : {str : (str, str
     Se verifică dacă orarul generat respectă cerințele profesorilor pentru a fi un orar valid.
     '''
 
+    timetable = as_days_dict(timetable)
+
     constrangeri_incalcate = 0
 
     for prof in timetable_specs[PROFESORI]:
@@ -174,7 +179,20 @@ def check_optional_constraints(timetable : {str : {(int, int) : {str : (str, str
                                     if prof == crt_prof:
                                         #print(f'Profesorul {prof} nu dorește să predea în ziua {day}!')
                                         constrangeri_incalcate += 1
-                
+
+                elif const.startswith('Pauza'):
+                    # PROFESORUL NU DOREȘTE PAUZE MAI LUNGI DE N ORE ÎNTRE 2 INTERVALE DIN ACEEAȘI ZI
+                    max_pauza = int(const.split('>')[1].strip())
+                    for day in timetable:
+                        intervale_predate = sorted(interval for interval in timetable[day]
+                                                   if any(timetable[day][interval][room] and
+                                                          timetable[day][interval][room][0] == prof
+                                                          for room in timetable[day][interval]))
+                        for anterior, urmator in zip(intervale_predate, intervale_predate[1:]):
+                            if urmator[0] - anterior[1] > max_pauza:
+                                #print(f'Profesorul {prof} are o pauză mai lungă de {max_pauza} ore în ziua {day}!')
+                                constrangeri_incalcate += 1
+
                 elif '-' in const:
                     interval = parse_interval(const)
                     start, end = interval
@@ -0,0 +1,72 @@
+import os
+import pickle
+import random
+import time
+from array import array
+from schedule import Schedule
+from schedule_data import ScheduleData
+from timetable import Timetable
+from progress import Progress
+
+
+class Checkpoint(Progress):
+    """
+    Progress channel saving the best state of a search to a file at most once every period seconds,
+    forwarding the events to another channel; a killed run leaves its last saved best state behind
+    """
+    def __init__(self, path: str, input_hash: str, algorithm: str, progress: Progress = None, period: float = 10.0):
+        self.path = path
+        self.input_hash = input_hash
+        self.algorithm = algorithm
+        self.progress = progress if progress is not None else Progress()
+        self.period = period
+        self.last_write = time.time()
+        self.pending = None # compact best state not written yet
+
+    def expanded(self, state, nr_expanded: int, best_cost: float):
+        self.progress.expanded(state, nr_expanded, best_cost)
+        if self.pending is not None and time.time() - self.last_write >= self.period:
+            self.flush()
+
+    def pushed(self, state):
+        self.progress.pushed(state)
+
+    def improved(self, state, cost: float):
+        self.progress.improved(state, cost)
+        # the state may be changed later by the search, its cells are copied
+        self.pending = {
+            'input_hash': self.input_hash,
+            'algorithm': self.algorithm,
+            'cost': cost,
+            'cells': array('i', state.timetable.cells),
+            'reached_students': array('i', state.reached_students),
+        }
+        if time.time() - self.last_write >= self.period:
+            self.flush()
+
+    def bounded(self, best_cost: float, lower_bound: float):
+        self.progress.bounded(best_cost, lower_bound)
+
+    def flush(self):
+        """Writes the best state not saved yet, replacing the previous checkpoint atomically"""
+        if self.pending is None:
+            return
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'wb') as file:
+            pickle.dump(self.pending, file)
+        os.replace(temporary_path, self.path)
+        self.pending = None
+        self.last_write = time.time()
+
+
+def load_checkpoint(path: str, schedule_data: ScheduleData, input_hash: str,
+                    rng: random.Random = None):
+    """Returns the state saved in a checkpoint and its cost, the checkpoint has to come from the same input"""
+    with open(path, 'rb') as file:
+        saved = pickle.load(file)
+    if saved['input_hash'] != input_hash:
+        raise ValueError(f'checkpoint {path} was saved for another input file')
+    state = Schedule(schedule_data, rng)
+    state.set_timetable(Timetable(schedule_data, saved['cells']))
+    state.reached_students = saved['reached_students']
+    return state, saved['cost']
@@ -0,0 +1,169 @@
+from array import array
+from schedule import Schedule
+from schedule_data import ScheduleData
+from evaluator import MAX_PROFESSOR_HOURS
+from stats import SearchStats
+from progress import Progress
+from budget import Budget
+
+
+class CSP:
+    """
+    Backtracking search over the placements of the courses: every step gives a (cell, professor) value
+    to the uncovered course with the fewest values left, until all the students are seated.
+    """
+
+    @staticmethod
+    def algorithm(schedule_data: ScheduleData, stats: SearchStats = None, progress: Progress = None,
+                  budget: Budget = None):
+        """
+        Returns a valid schedule and the number of expanded nodes, or None if the problem has no solution
+        or the budget is exhausted before a solution is found
+        """
+        stats = stats if stats is not None else SearchStats()
+        progress = progress if progress is not None else Progress()
+
+        state = Schedule(schedule_data)
+        state.initialize_all_data()
+        neighbours = CSP.neighbours(schedule_data)
+        # the cells of a course are placed in increasing order, so every set of cells is tried only once
+        last_cells = [-1] * len(schedule_data.course_names)
+
+        found = CSP.__backtrack(state, neighbours, last_cells, stats, progress, budget)
+        if not found:
+            return None, stats.states_expanded
+        solution = CSP.solution(state)
+        progress.improved(solution, solution.evaluator.soft_cost)
+        return solution, stats.states_expanded
+
+    @staticmethod
+    def neighbours(schedule_data: ScheduleData):
+        """Returns the courses competing for professors or classrooms with every course"""
+        nr_courses = len(schedule_data.course_names)
+        return [[other for other in range(nr_courses) if other != course and
+                 (schedule_data.course_professors_mask[course] & schedule_data.course_professors_mask[other]
+                  or schedule_data.course_classrooms_mask[course] & schedule_data.course_classrooms_mask[other])]
+                for course in range(nr_courses)]
+
+    @staticmethod
+    def uncovered(state: Schedule):
+        """Returns the ids of the courses which still have students left to seat"""
+        data = state.schedule_data
+        return [course for course in range(len(data.course_names))
+                if state.students_left[data.course_names[course]] > 0]
+
+    @staticmethod
+    def domains(state: Schedule, uncovered: list, last_cells: list):
+        """Returns the (cell, professor) values left for every uncovered course"""
+        return {course: [(cell, professor) for cell, professor in state.course_options(course)
+                         if cell > last_cells[course]]
+                for course in uncovered}
+
+    @staticmethod
+    def select_course(uncovered: list, domains: dict, neighbours: list):
+        """Minimum remaining values, ties broken by the number of uncovered courses competing for the same resources"""
+        return min(uncovered, key=lambda course: (len(domains[course]),
+                                                  -sum(1 for other in neighbours[course] if other in domains),
+                                                  course))
+
+    @staticmethod
+    def solution(state: Schedule):
+        """Copies the partial schedule of the search into a regular state"""
+        solution = Schedule(state.schedule_data, state.random)
+        solution.set_timetable(state.timetable.copy())
+        solution.reached_students = array('i', state.reached_students)
+        return solution
+
+    def __backtrack(state: Schedule, neighbours: list, last_cells: list, stats: SearchStats, progress: Progress,
+                    budget: Budget):
+        """Assigns the uncovered courses recursively, returns True when all of them are covered"""
+        data = state.schedule_data
+        uncovered = CSP.uncovered(state)
+        if len(uncovered) == 0:
+            return True
+
+        if budget is not None and budget.exhausted(stats):
+            return False
+        stats.states_expanded += 1
+        progress.expanded(state, stats.states_expanded, state.evaluator.soft_cost)
+
+        domains = CSP.domains(state, uncovered, last_cells)
+        if not CSP.consistent(state, uncovered, domains, neighbours):
+            return False
+
+        course = CSP.select_course(uncovered, domains, neighbours)
+        course_name = data.course_names[course]
+        students_left = state.students_left[course_name]
+        nr_classrooms = state.timetable.nr_classrooms
+
+        def value_cost(value):
+            cell, professor = value
+            capacity = data.capacities[cell % nr_classrooms]
+            # wasted seats first, then violated preferences, then the largest classroom
+            return (max(0, capacity - students_left), data.preference_penalties[professor][cell // nr_classrooms],
+                    -capacity, cell, professor)
+
+        values = sorted(domains[course], key=value_cost)
+        stats.successors_generated += len(values)
+        previous_cell = last_cells[course]
+        for cell, professor in values:
+            day, interval, classroom = state.timetable.slot(cell)
+            state.assign_course(course_name, day, interval, classroom, data.professor_names[professor])
+            last_cells[course] = cell
+            if CSP.__backtrack(state, neighbours, last_cells, stats, progress, budget):
+                return True
+            state.unassign_course(cell)
+        last_cells[course] = previous_cell
+        return False
+
+    @staticmethod
+    def bounds(state: Schedule, course: int, values: list):
+        """
+        Returns the free capacity of the values of a course, the professors able to teach it,
+        and the fewest intervals needed to seat its students, None if they can't all be seated
+        """
+        data = state.schedule_data
+        students_left = state.students_left[data.course_names[course]]
+        cells = {cell for cell, _ in values}
+        professors = {professor for _, professor in values}
+        capacities = sorted((data.capacities[cell % state.timetable.nr_classrooms] for cell in cells), reverse=True)
+
+        needed_intervals = 0
+        seated = 0
+        while seated < students_left and needed_intervals < len(capacities):
+            seated += capacities[needed_intervals]
+            needed_intervals += 1
+        if seated < students_left:
+            return cells, professors, None
+        return cells, professors, needed_intervals
+
+    @staticmethod
+    def consistent(state: Schedule, uncovered: list, domains: dict, neighbours: list):
+        """
+        Forward checks every uncovered course against the free classrooms and professor hours left,
+        then checks every pair of competing courses against the resources they share. No value is pruned:
+        a course takes several values, so the pair checks compare the resources of the two courses as a whole
+        """
+        data = state.schedule_data
+        hours_left = [MAX_PROFESSOR_HOURS - hours for hours in state.evaluator.professor_hours]
+        bounds = {}
+        for course in uncovered:
+            cells, professors, needed_intervals = CSP.bounds(state, course, domains[course])
+            if needed_intervals is None or sum(hours_left[professor] for professor in professors) < needed_intervals:
+                return False
+            bounds[course] = cells, professors, needed_intervals
+
+        for course in uncovered:
+            for other in neighbours[course]:
+                if other not in bounds or other < course:
+                    continue
+                cells, professors, needed_intervals = bounds[course]
+                other_cells, other_professors, other_needed_intervals = bounds[other]
+                # a cell seats a single course, an hour of a professor is used by a single course
+                students_left = state.students_left[data.course_names[course]]\
+                    + state.students_left[data.course_names[other]]
+                capacity = sum(data.capacities[cell % state.timetable.nr_classrooms] for cell in cells | other_cells)
+                hours = sum(hours_left[professor] for professor in professors | other_professors)
+                if capacity < students_left or hours < needed_intervals + other_needed_intervals:
+                    return False
+        return True
@@ -0,0 +1,173 @@
+from array import array
+from timetable import Timetable, EMPTY
+from moves import Move
+from check_constraints import check_mandatory_constraints, check_optional_constraints
+
+MAX_PROFESSOR_HOURS = 7 # intervals a professor may teach in a week
+
+
+class ConstraintEvaluator:
+    """Keeps the hard and soft constraints counters of a timetable, updated in O(1) for every changed cell"""
+    def __init__(self, timetable: Timetable):
+        data = timetable.schedule_data
+        self.schedule_data = data
+        self.nr_courses = timetable.nr_courses
+        self.nr_classrooms = timetable.nr_classrooms
+        self.nr_professors = len(data.professor_names)
+        self.targets = [data.courses[course] for course in data.course_names]
+
+        self.professor_hours = array('i', [0]) * self.nr_professors
+        self.coverage = array('i', [0]) * self.nr_courses # sum of the capacities assigned to every course
+        self.course_assignments = array('i', [0]) * self.nr_courses
+        # number of classrooms in which a professor teaches, indexed by [slot * nr professors + professor]
+        self.slot_professors = array('i', [0]) * (timetable.nr_days * timetable.nr_intervals * self.nr_professors)
+        self.professor_violations = array('i', [0]) * self.nr_professors # violated preferences tallies
+        self.nr_intervals = timetable.nr_intervals
+        # bitset of the intervals in which a professor teaches, indexed by [day * nr professors + professor]
+        self.professor_days = array('i', [0]) * (timetable.nr_days * self.nr_professors)
+        self.gap_cost = 0 # violated '!Pauza > N' constraints, also counted in the soft cost
+        self.full_professors = 0 # bitset of the professors teaching at least MAX_PROFESSOR_HOURS intervals
+        self.soft_cost = 0
+        # courses are not covered at all in an empty timetable
+        self.hard_cost = sum(1 for target in self.targets if target > 0)
+
+        for cell, assignment in enumerate(timetable.cells):
+            if assignment != EMPTY:
+                self.add(cell, assignment)
+
+    def copy(self):
+        """Returns a copy of the counters"""
+        evaluator = ConstraintEvaluator.__new__(ConstraintEvaluator)
+        evaluator.__dict__.update(self.__dict__)
+        evaluator.professor_hours = array('i', self.professor_hours)
+        evaluator.coverage = array('i', self.coverage)
+        evaluator.course_assignments = array('i', self.course_assignments)
+        evaluator.slot_professors = array('i', self.slot_professors)
+        evaluator.professor_violations = array('i', self.professor_violations)
+        evaluator.professor_days = array('i', self.professor_days)
+        return evaluator
+
+    def available_professors(self, course: int):
+        """Returns the bitset of the professors teaching the course which didn't reach the maximum hours"""
+        return self.schedule_data.course_professors_mask[course] & ~self.full_professors
+
+    def add(self, cell: int, assignment: int):
+        """Updates the counters when an assignment is placed in a cell"""
+        data = self.schedule_data
+        professor, course = divmod(assignment, self.nr_courses)
+        slot, classroom = divmod(cell, self.nr_classrooms)
+
+        # professor teaching in 2 classrooms in the same interval
+        occupancy = slot * self.nr_professors + professor
+        if self.slot_professors[occupancy] > 0:
+            self.hard_cost += 1
+        else:
+            self.toggle_interval(slot, professor)
+        self.slot_professors[occupancy] += 1
+
+        if not data.course_allowed_in_classroom[course][classroom]:
+            self.hard_cost += 1
+        if not data.professor_teaches_course[professor][course]:
+            self.hard_cost += 1
+
+        coverage = self.coverage[course] + data.capacities[classroom]
+        if self.coverage[course] < self.targets[course] <= coverage:
+            self.hard_cost -= 1
+        self.coverage[course] = coverage
+        self.course_assignments[course] += 1
+
+        self.professor_hours[professor] += 1
+        if self.professor_hours[professor] == MAX_PROFESSOR_HOURS:
+            self.full_professors |= 1 << professor
+        elif self.professor_hours[professor] == MAX_PROFESSOR_HOURS + 1:
+            self.hard_cost += 1
+
+        penalty = data.preference_penalties[professor][slot]
+        self.professor_violations[professor] += penalty
+        self.soft_cost += penalty
+
+    def remove(self, cell: int, assignment: int):
+        """Updates the counters when an assignment is removed from a cell"""
+        data = self.schedule_data
+        professor, course = divmod(assignment, self.nr_courses)
+        slot, classroom = divmod(cell, self.nr_classrooms)
+
+        occupancy = slot * self.nr_professors + professor
+        self.slot_professors[occupancy] -= 1
+        if self.slot_professors[occupancy] > 0:
+            self.hard_cost -= 1
+        else:
+            self.toggle_interval(slot, professor)
+
+        if not data.course_allowed_in_classroom[course][classroom]:
+            self.hard_cost -= 1
+        if not data.professor_teaches_course[professor][course]:
+            self.hard_cost -= 1
+
+        coverage = self.coverage[course] - data.capacities[classroom]
+        if coverage < self.targets[course] <= self.coverage[course]:
+            self.hard_cost += 1
+        self.coverage[course] = coverage
+        self.course_assignments[course] -= 1
+
+        if self.professor_hours[professor] == MAX_PROFESSOR_HOURS + 1:
+            self.hard_cost -= 1
+        elif self.professor_hours[professor] == MAX_PROFESSOR_HOURS:
+            self.full_professors &= ~(1 << professor)
+        self.professor_hours[professor] -= 1
+
+        penalty = data.preference_penalties[professor][slot]
+        self.professor_violations[professor] -= penalty
+        self.soft_cost -= penalty
+
+    def toggle_interval(self, slot: int, professor: int):
+        """Updates the intervals of the day of a professor who starts or stops teaching in a slot"""
+        gap_penalties = self.schedule_data.gap_penalties[professor]
+        day, interval = divmod(slot, self.nr_intervals)
+        index = day * self.nr_professors + professor
+        old_mask = self.professor_days[index]
+        new_mask = old_mask ^ (1 << interval)
+        self.professor_days[index] = new_mask
+        if gap_penalties is not None:
+            gap_delta = gap_penalties[new_mask] - gap_penalties[old_mask]
+            self.gap_cost += gap_delta
+            self.soft_cost += gap_delta
+
+    def write(self, cell: int, old: int, new: int):
+        """Updates the counters when a cell changes from an assignment id to another"""
+        if old != EMPTY:
+            self.remove(cell, old)
+        if new != EMPTY:
+            self.add(cell, new)
+
+    def apply(self, move: Move):
+        """Updates the counters for a move applied on the timetable"""
+        for cell, old, new in move.writes:
+            self.write(cell, old, new)
+
+    def undo(self, move: Move):
+        """Updates the counters for a move reverted on the timetable"""
+        for cell, old, new in reversed(move.writes):
+            self.write(cell, new, old)
+
+    def delta(self, move: Move):
+        """Returns the (hard, soft) cost change of a move, without changing the timetable"""
+        hard_cost, soft_cost = self.hard_cost, self.soft_cost
+        self.apply(move)
+        delta = self.hard_cost - hard_cost, self.soft_cost - soft_cost
+        self.undo(move)
+        return delta
+
+    def verify(self, timetable: Timetable):
+        """Checks the counters against a full rescan of the timetable and the constraints checker"""
+        fresh = ConstraintEvaluator(timetable)
+        return self.hard_cost == fresh.hard_cost == check_mandatory_constraints(timetable, self.schedule_data.specs)\
+            and self.soft_cost == fresh.soft_cost == check_optional_constraints(timetable, self.schedule_data.specs)\
+            and self.gap_cost == fresh.gap_cost\
+            and self.professor_days == fresh.professor_days\
+            and self.professor_hours == fresh.professor_hours\
+            and self.coverage == fresh.coverage\
+            and self.course_assignments == fresh.course_assignments\
+            and self.slot_professors == fresh.slot_professors\
+            and self.professor_violations == fresh.professor_violations\
+            and self.full_professors == fresh.full_professors
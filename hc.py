@@ -1,6 +1,13 @@
 from schedule import Schedule
 from schedule_data import ScheduleData
-from check_constraints import check_optional_constraints, pretty_print_timetable
+from utils import pretty_print_timetable
+from progress import Progress
+from timetable import Timetable
+from stats import SearchStats
+from transposition import TranspositionTable
+from neighbourhoods import NeighbourhoodSearch
+from budget import Budget, start_workers, stop_workers, worker_stopped, worker_budget
+import random
 import sys
 import time
 
@@ -8,90 +15,206 @@ class HillClimbing:
 
     def __calculate_cost(schedule: Schedule):
         """Calculates the cost of the current state based on soft constraints"""
-        cost = 0
-        for day in schedule.days:
-            for interval, classroom in schedule.days[day].items():
-                for value in classroom.values():
-                    if value is not None:
-                        professor = value[0]
-                            # checking if the professor has any constraints
-                        if day not in schedule.schedule_data.professors[professor].preferences:
-                            #print("Professor ", professor, " doesn't want to work on day ", day)
-                            schedule.add_violated_constraint(professor, day, None)
-                            cost += 1
-                        if interval not in schedule.schedule_data.professors[professor].preferences:
-                            #print("Professor ", professor, " doesn't want to work in interval ", interval)
-                            schedule.add_violated_constraint(professor, None, interval)
-                            cost += 1
-        #print("Violated constraints: ", schedule.violated_constraints)               
-        return cost
+        # kept up to date by the incremental evaluator of the schedule
+        return schedule.evaluator.soft_cost
     
-    def __hill_climbing(initial_state: Schedule, input_file: str, max_iters = 5000):
+    def __hill_climbing(initial_state: Schedule, max_iters = 5000, stats: SearchStats = None,
+                        table: TranspositionTable = None, local_search: NeighbourhoodSearch = None,
+                        budget: Budget = None):
         """Hill climbing algorithm used in random restart hill climbing algorithm"""
         iters = 0
         current_state = initial_state
         current_state_cost = sys.maxsize
+        stats = stats if stats is not None else SearchStats()
+        table = table if table is not None else TranspositionTable(0)
         while iters < max_iters:
+            if budget is not None and budget.exhausted(stats):
+                break
             current_state_cost = HillClimbing.__calculate_cost(current_state)
-            successors = current_state.successors()
-            best_state = current_state
-            for successor in successors:
-            
-                successor_cost = HillClimbing.__calculate_cost(successor)
-                if successor_cost < current_state_cost:
-                    best_state = successor
+            if local_search is not None:
+                # the move chosen from the neighbourhoods is applied in place, the restart owns its state
+                move, _ = local_search.select(current_state, stats, budget)
+                stats.states_expanded += 1
+                iters += 1
+                if move is None:
+                    break
+                current_state.apply_move(move)
+                continue
 
+            best_move = None
+            best_cost = current_state_cost
+            moves = current_state.successor_moves()
+            stats.states_expanded += 1
+            stats.successors_generated += len(moves)
+            # successors are evaluated as moves, by the cost change computed incrementally,
+            # or by the cost cached when the same state was reached before
+            for move in moves:
+                successor_hash = move.zobrist_after(current_state.timetable)
+                successor_cost = table.lookup(successor_hash)
+                if successor_cost is None:
+                    successor_cost = current_state_cost + current_state.evaluator.delta(move)[1]
+                    table.store(successor_hash, successor_cost)
+                if successor_cost < best_cost:
+                    best_move = move
+                    best_cost = successor_cost
 
-        
-            if best_state == current_state:
+            if best_move is None:
                 iters += 1
                 break
-        
-            current_state = best_state
-        
+
+            # only the chosen successor is materialized
+            current_state = current_state.materialize(best_move)
+            stats.states_materialized += 1
+
             iters += 1
-    
+
+        current_state_cost = HillClimbing.__calculate_cost(current_state)
         return current_state, current_state_cost, iters # return the best state found, its cost and the number of iterations
     
     
+    @staticmethod
+    def restart(schedule_data: ScheduleData, max_iterations: int = 5000, seed: int = None,
+                stats: SearchStats = None, init: str = 'random', table: TranspositionTable = None,
+                local_search: NeighbourhoodSearch = None, budget: Budget = None):
+        """Runs hill climbing once, from a new random initial state"""
+        initial_state = Schedule(schedule_data, random.Random(seed)) # the previous state may be kept as best state
+        initial_state.create_state(init) # creating a random initial state
+        if stats is not None:
+            stats.construction_retries += initial_state.construction_retries
+        return HillClimbing.__hill_climbing(initial_state, max_iterations, stats, table, local_search,
+                                            budget) # running hill climbing algorithm
+
+    def __sequential_restarts(schedule_data: ScheduleData, seeds: list, max_iterations: int,
+                              stats: SearchStats, init: str, table: TranspositionTable,
+                              local_search: NeighbourhoodSearch, budget: Budget):
+        """Yields (state, cost, iterations) for every restart, run one after another"""
+        for seed in seeds:
+            yield HillClimbing.restart(schedule_data, max_iterations, seed, stats, init, table, local_search, budget)
+
+    def __parallel_restarts(schedule_data: ScheduleData, seeds: list, max_iterations: int, workers: int,
+                            stats: SearchStats, init: str, table: TranspositionTable,
+                            local_search: NeighbourhoodSearch, budget: Budget):
+        """
+        Yields (state, cost, iterations) for every restart, run in a process pool, in the order of the restarts,
+        so the same seed returns the same state whichever worker finishes first
+        """
+        # the schedule data is shipped once to every worker, restarts only receive their seed;
+        # every worker has its own transposition table, with the same size as the table of the run;
+        # the restarts share the deadline and the evaluations of the budget
+        executor, stop = start_workers(workers, _init_worker, (schedule_data, table.max_entries),
+                                       stats.successors_generated)
+        try:
+            futures = [executor.submit(_run_restart, seed, max_iterations, init, local_search, budget) for seed in seeds]
+            for future in futures:
+                cells, cost, iters, worker_stats = future.result()
+                stats.add(worker_stats)
+                state = Schedule(schedule_data)
+                state.set_timetable(Timetable(schedule_data, cells))
+                yield state, cost, iters
+        finally:
+            # the caller can stop early, once a state of cost 0 is found or the budget is exhausted
+            stop_workers(executor, stop)
+
+    def __resumed_restarts(initial_state: Schedule, max_iterations: int, stats: SearchStats,
+                           table: TranspositionTable, local_search: NeighbourhoodSearch, budget: Budget, restarts):
+        """Yields the climb from the given initial state, then the other restarts"""
+        try:
+            yield HillClimbing.__hill_climbing(initial_state, max_iterations, stats, table, local_search, budget)
+            yield from restarts
+        finally:
+            restarts.close()
+
     @staticmethod
     def random_restart_hill_climbing(
     start_time: float,
-    input_file: str,
     schedule_data: ScheduleData,
     max_restarts: int = 500,
-    max_iterations: int = 5000):
+    max_iterations: int = 5000,
+    workers: int = 1,
+    seed: int = None,
+    stats: SearchStats = None,
+    progress: Progress = None,
+    init: str = 'random',
+    table: TranspositionTable = None,
+    local_search: NeighbourhoodSearch = None,
+    budget: Budget = None,
+    initial_state: Schedule = None):
 
-        """Random restart hill climbing algorithm"""
+        """
+        Random restart hill climbing algorithm, returns the best state, its cost, the iterations and the restarts.
+        The restarts stop when the budget is exhausted; a given initial state (e.g. a resumed checkpoint)
+        is climbed first, as the first restart.
+        """
         total_iters = 0
+        nr_restarts = 0
         best_state = None
         best_cost = sys.maxsize
-        initial_state = Schedule(schedule_data)
-    
-    
-        for _ in range(max_restarts):
+        stats = stats if stats is not None else SearchStats()
+        progress = progress if progress is not None else Progress()
+        # states reached again, by the same or by another restart, reuse the cached costs
+        table = table if table is not None else TranspositionTable(0)
 
-            initial_state.create_initial_state() # creating a random initial state
-            
-            state, cost, iters = HillClimbing.__hill_climbing(initial_state, input_file, max_iterations) # running hill climbing algorithm
+        # every restart has its own seed, derived from the seed of the run
+        rng = random.Random(seed)
+        seeds = [rng.randrange(2 ** 32) for _ in range(max_restarts)]
+        if workers > 1:
+            restarts = HillClimbing.__parallel_restarts(schedule_data, seeds, max_iterations, workers, stats, init,
+                                                        table, local_search, budget)
+        else:
+            restarts = HillClimbing.__sequential_restarts(schedule_data, seeds, max_iterations, stats, init, table,
+                                                          local_search, budget)
+        if initial_state is not None:
+            restarts = HillClimbing.__resumed_restarts(initial_state, max_iterations, stats, table, local_search,
+                                                       budget, restarts)
+
+        for state, cost, iters in restarts:
             total_iters += iters # storing the total number of iterations
+            nr_restarts += 1
+            progress.expanded(state, nr_restarts, best_cost)
         
             if cost <= best_cost: # the best state found so far
             
                 best_state = state
                 best_cost = cost
-                print("CHANGED STATE!", "New cost: ", cost)
-                print(pretty_print_timetable(best_state.days, input_file))
-                print("Violated optional constraints: ", check_optional_constraints(best_state.days, schedule_data.specs))
+                progress.improved(best_state, cost)
                 if cost == 0:
                     print("FOUND OPTIMAL SOLUTION!")
                     break
+            if budget is not None and budget.exhausted(stats):
+                print("Budget exhausted!")
+                break
+        restarts.close()
     
         print("Reached limit of iterations!")
         print("Final cost: ", best_cost)
         print("Total iterations: ", total_iters)
         elapsed_time = time.time() - start_time
         with open('output.txt', 'w') as file:
-            file.write(pretty_print_timetable(best_state.days, input_file))
+            file.write(pretty_print_timetable(best_state.timetable, schedule_data))
             file.write(f'\nCost: {best_cost}')
-            file.write(f'\nElapsed time: {elapsed_time}')
\ No newline at end of file
+            file.write(f'\nElapsed time: {elapsed_time}')
+        return best_state, best_cost, total_iters, nr_restarts
+
+
+# state of the worker processes used by the parallel random restart hill climbing
+_worker_schedule_data = None
+_worker_table = None
+
+def _init_worker(schedule_data: ScheduleData, table_entries: int):
+    """Stores the schedule data received once by a worker process and creates its transposition table"""
+    global _worker_schedule_data, _worker_table
+    _worker_schedule_data = schedule_data
+    _worker_table = TranspositionTable(table_entries)
+
+def _run_restart(seed: int, max_iterations: int, init: str, local_search: NeighbourhoodSearch, budget: Budget):
+    """
+    Runs a hill climbing restart in a worker process and returns the compact state, its cost, the iterations
+    and the stats; the state is None when the search was stopped before the restart began
+    """
+    stats = SearchStats()
+    if worker_stopped():
+        return None, None, 0, stats
+    budget = worker_budget(budget)
+    state, cost, iters = HillClimbing.restart(_worker_schedule_data, max_iterations, seed, stats, init, _worker_table,
+                                              local_search, budget)
+    return state.timetable.cells, cost, iters, stats
@@ -0,0 +1,44 @@
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+
+
+def file_hash(file_path: str):
+    """Returns the sha256 of a file"""
+    with open(file_path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+class RunManifest:
+    """Describes a run (seed, algorithm, input, phases durations, results) so it can be repeated exactly"""
+    def __init__(self, algorithm: str, input_file: str, seed: int, **options):
+        self.data = {
+            'algorithm': algorithm,
+            'input_file': input_file,
+            'input_hash': file_hash(input_file),
+            'seed': seed,
+            'options': options,
+            'phases': {}, # seconds spent in every phase of the run
+        }
+
+    @contextmanager
+    def phase(self, name: str):
+        """Measures the wall clock time of a phase of the run"""
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            self.data['phases'][name] = time.time() - start_time
+
+    def update(self, **fields):
+        """Adds results to the manifest"""
+        self.data.update(fields)
+
+    def write(self, output_file: str = 'output.txt'):
+        """Writes the manifest as json next to the output file"""
+        manifest_file = os.path.join(os.path.dirname(output_file), 'run_manifest.json')
+        with open(manifest_file, 'w') as file:
+            json.dump(self.data, file, indent=4)
+        return manifest_file
@@ -0,0 +1,260 @@
+import random
+from array import array
+from schedule import Schedule
+from schedule_data import ScheduleData
+from timetable import Timetable, EMPTY
+from evaluator import MAX_PROFESSOR_HOURS
+from neighbourhoods import NeighbourhoodSearch, RANDOM_MOVE_NEIGHBOURHOODS
+from stats import SearchStats
+from progress import Progress
+from budget import Budget, start_workers, stop_workers, worker_stopped, worker_budget
+from batch import BatchScorer, np
+
+LOCAL_SEARCH_NEIGHBOURHOODS = ['relocate', 'professors', 'reassign', 'kempe'] # moves refining every child
+
+
+class MemeticAlgorithm:
+    """
+    Memetic search: a population of valid timetables evolved by day block crossover, repair of the hard
+    constraints, random mutations and a short first improvement local search of every child
+    """
+
+    @staticmethod
+    def state_from(schedule_data: ScheduleData, cells: array, reached_students: array, rng: random.Random = None):
+        """Rebuilds a state from its compact cells and seated students"""
+        state = Schedule(schedule_data, rng)
+        state.set_timetable(Timetable(schedule_data, array('i', cells)))
+        state.reached_students = array('i', reached_students)
+        return state
+
+    @staticmethod
+    def crossover(schedule_data: ScheduleData, first: tuple, second: tuple, rng: random.Random):
+        """Returns a child inheriting every day, as a block of cells, from one of the (cells, seated students) parents"""
+        cells = array('i', first[0])
+        reached_students = array('i', first[1])
+        day_size = len(schedule_data.interval_names) * len(schedule_data.classroom_names)
+        for day in range(len(schedule_data.day_names)):
+            if rng.random() < 0.5:
+                start, end = day * day_size, (day + 1) * day_size
+                cells[start:end] = second[0][start:end]
+                reached_students[start:end] = second[1][start:end]
+        return MemeticAlgorithm.state_from(schedule_data, cells, reached_students, rng)
+
+    @staticmethod
+    def repair(child: Schedule):
+        """
+        Makes a crossover child valid again, returns False if it can't: a day block keeps the constraints of
+        its slots, only the hours of the professors and the coverage of the courses can be broken
+        """
+        data = child.schedule_data
+        nr_classrooms = child.timetable.nr_classrooms
+        seated = [0] * len(data.course_names)
+        for cell, assignment in enumerate(child.timetable.cells):
+            if assignment != EMPTY:
+                seated[assignment % child.timetable.nr_courses] += child.reached_students[cell]
+        targets = [data.courses[course] for course in data.course_names]
+
+        def unassign(cell: int):
+            seated[child.timetable.cells[cell] % child.timetable.nr_courses] -= child.reached_students[cell]
+            child.unassign_course(cell)
+
+        def removal_cost(cell: int):
+            professor, course = child.timetable.get(cell)
+            # cells not needed for the coverage first, then the ones violating preferences, then the emptiest
+            uncovering = seated[course] - child.reached_students[cell] < targets[course]
+            return uncovering, -data.preference_penalties[professor][cell // nr_classrooms], \
+                child.reached_students[cell], cell
+
+        # professors above the cap of hours give up their least useful intervals
+        for professor in range(len(data.professor_names)):
+            while child.evaluator.professor_hours[professor] > MAX_PROFESSOR_HOURS:
+                cells = [cell for cell, assignment in enumerate(child.timetable.cells)
+                         if assignment != EMPTY and assignment // child.timetable.nr_courses == professor]
+                unassign(min(cells, key=removal_cost))
+
+        # classrooms of courses covered twice are dropped, freeing hours for the uncovered courses
+        for cell in sorted((cell for cell, assignment in enumerate(child.timetable.cells) if assignment != EMPTY),
+                           key=removal_cost):
+            course = child.timetable.cells[cell] % child.timetable.nr_courses
+            if seated[course] - child.reached_students[cell] >= targets[course]:
+                unassign(cell)
+
+        # the students left are placed by the greedy constructor
+        child.students_left = {course: max(0, targets[course_id] - seated[course_id])
+                               for course_id, course in enumerate(data.course_names)}
+        child.construction_retries = 0
+        return child.construct_greedily()
+
+    @staticmethod
+    def mutate(state: Schedule, nr_moves: int, random_moves: NeighbourhoodSearch):
+        """Applies random moves of the neighbourhoods keeping the state valid"""
+        for _ in range(nr_moves):
+            move = random_moves.random_move(state)
+            if move is not None and state.evaluator.delta(move)[0] <= 0:
+                state.apply_move(move)
+
+    @staticmethod
+    def offspring(schedule_data: ScheduleData, first: tuple, second: tuple, rng: random.Random, stats: SearchStats,
+                  mutation_moves: int = 3, local_search_steps: int = 20, sample_size: int = 50,
+                  budget: Budget = None, neighbourhoods: list = None):
+        """Returns a valid child of two (cells, seated students) parents, refined by local search until the budget runs out"""
+        child = MemeticAlgorithm.crossover(schedule_data, first, second, rng)
+        if not MemeticAlgorithm.repair(child):
+            # the first parent is mutated instead
+            child = MemeticAlgorithm.state_from(schedule_data, first[0], first[1], rng)
+        random_moves = NeighbourhoodSearch(neighbourhoods or RANDOM_MOVE_NEIGHBOURHOODS)
+        MemeticAlgorithm.mutate(child, mutation_moves, random_moves)
+
+        local_search = NeighbourhoodSearch(LOCAL_SEARCH_NEIGHBOURHOODS, 'first', sample_size)
+        for _ in range(local_search_steps):
+            if budget is not None and budget.exhausted(stats):
+                break
+            move, _ = local_search.select(child, stats, budget)
+            if move is None:
+                break
+            child.apply_move(move)
+        stats.states_expanded += 1
+        return child
+
+    @staticmethod
+    def fitness(population: list, scorer: BatchScorer = None):
+        """Returns the (hard, soft) costs of the population, scored in a single batch when numpy is available"""
+        if scorer is None:
+            return [(state.evaluator.hard_cost, state.evaluator.soft_cost) for state in population]
+        hard, soft = scorer.score_states(population)
+        return list(zip(hard.tolist(), soft.tolist()))
+
+    @staticmethod
+    def tournament(population: list, costs: list, rng: random.Random):
+        """Returns the (cells, seated students) of the best of 2 random individuals"""
+        first, second = rng.randrange(len(population)), rng.randrange(len(population))
+        winner = population[first] if costs[first] <= costs[second] else population[second]
+        return winner.timetable.cells, winner.reached_students
+
+    @staticmethod
+    def algorithm(schedule_data: ScheduleData, stats: SearchStats = None, progress: Progress = None,
+                  population_size: int = 20, generations: int = 200, seed: int = None, init: str = 'greedy',
+                  workers: int = 1, budget: Budget = None, mutation_moves: int = 3, local_search_steps: int = 20,
+                  sample_size: int = 50, initial_state: Schedule = None, neighbourhoods: list = None):
+        """
+        Returns the best state found, its cost and the number of generations.
+        A given initial state (e.g. a resumed checkpoint) takes the place of one of the initial individuals.
+        The budget is checked after every initial individual, so the population can be smaller when it runs out.
+        Every generation breeds population_size children from tournament parents and keeps the best distinct
+        individuals among the parents and the children. With workers > 1 the initial states and the children
+        are built in a process pool; the population is scored in batch by numpy when it is installed.
+        """
+        stats = stats if stats is not None else SearchStats()
+        progress = progress if progress is not None else Progress()
+        rng = random.Random(seed)
+        scorer = BatchScorer(schedule_data) if np is not None else None
+
+        executor = None
+        stop = None
+        if workers > 1:
+            executor, stop = start_workers(workers, _init_worker, (schedule_data,), stats.successors_generated)
+        try:
+            seeds = [rng.randrange(2 ** 32) for _ in range(population_size)]
+            # a given initial state takes the place of one of the individuals
+            population = [initial_state] if initial_state is not None else []
+            seeds = seeds[:population_size - len(population)]
+            # the budget is checked after every individual, the population keeps the ones built in time
+            if executor is not None:
+                for individual_seed, (cells, reached, retries) in zip(
+                        seeds, executor.map(_create_individual, seeds, [init] * len(seeds))):
+                    if cells is None:
+                        break
+                    stats.construction_retries += retries
+                    population.append(MemeticAlgorithm.state_from(schedule_data, cells, reached,
+                                                                  random.Random(individual_seed)))
+                    if budget is not None and budget.exhausted(stats):
+                        break
+            else:
+                for individual_seed in seeds:
+                    if len(population) > 0 and budget is not None and budget.exhausted(stats):
+                        break
+                    individual = Schedule(schedule_data, random.Random(individual_seed))
+                    individual.create_state(init)
+                    stats.construction_retries += individual.construction_retries
+                    population.append(individual)
+            costs = MemeticAlgorithm.fitness(population, scorer)
+
+            best_index = min(range(len(population)), key=lambda index: costs[index])
+            best_state, best_cost = population[best_index].copy(), costs[best_index][1]
+            progress.improved(best_state, best_cost)
+
+            generation = 0
+            while generation < generations and best_cost > 0:
+                if budget is not None and budget.exhausted(stats):
+                    break
+                generation += 1
+
+                parents = [(MemeticAlgorithm.tournament(population, costs, rng),
+                            MemeticAlgorithm.tournament(population, costs, rng),
+                            rng.randrange(2 ** 32)) for _ in range(population_size)]
+                if executor is not None:
+                    children = []
+                    options = (mutation_moves, local_search_steps, sample_size, budget, neighbourhoods)
+                    for cells, reached, worker_stats in executor.map(_breed, parents, [options] * len(parents)):
+                        stats.add(worker_stats)
+                        children.append(MemeticAlgorithm.state_from(schedule_data, cells, reached,
+                                                                     random.Random(rng.randrange(2 ** 32))))
+                else:
+                    children = [MemeticAlgorithm.offspring(schedule_data, first, second, random.Random(child_seed),
+                                                           stats, mutation_moves, local_search_steps, sample_size,
+                                                           budget, neighbourhoods)
+                                for first, second, child_seed in parents]
+                stats.states_materialized += len(children)
+                progress.expanded(best_state, generation, best_cost)
+
+                # elitist replacement, keeping a single copy of every timetable
+                candidates = population + children
+                candidate_costs = costs + MemeticAlgorithm.fitness(children, scorer)
+                population, costs, seen = [], [], set()
+                for index in sorted(range(len(candidates)), key=lambda index: candidate_costs[index]):
+                    if candidates[index].state_hash() in seen:
+                        continue
+                    seen.add(candidates[index].state_hash())
+                    population.append(candidates[index])
+                    costs.append(candidate_costs[index])
+                    if len(population) == population_size:
+                        break
+
+                if costs[0][0] == 0 and costs[0][1] < best_cost:
+                    best_state, best_cost = population[0].copy(), costs[0][1]
+                    progress.improved(best_state, best_cost)
+        finally:
+            if executor is not None:
+                stop_workers(executor, stop)
+
+        return best_state, best_cost, generation
+
+
+# state of the worker processes used by the parallel memetic search
+_worker_schedule_data = None
+
+def _init_worker(schedule_data: ScheduleData):
+    """Stores the schedule data received once by a worker process"""
+    global _worker_schedule_data
+    _worker_schedule_data = schedule_data
+
+def _create_individual(seed: int, init: str):
+    """
+    Builds an initial state in a worker process and returns its compact cells, seated students and retries;
+    the cells are None when the search was stopped before the individual began
+    """
+    if worker_stopped():
+        return None, None, 0
+    individual = Schedule(_worker_schedule_data, random.Random(seed))
+    individual.create_state(init)
+    return individual.timetable.cells, individual.reached_students, individual.construction_retries
+
+def _breed(parents: tuple, options: tuple):
+    """Breeds a child in a worker process and returns its compact cells, seated students and the stats"""
+    first, second, seed = parents
+    mutation_moves, local_search_steps, sample_size, budget, neighbourhoods = options
+    budget = worker_budget(budget)
+    stats = SearchStats()
+    child = MemeticAlgorithm.offspring(_worker_schedule_data, first, second, random.Random(seed), stats,
+                                       mutation_moves, local_search_steps, sample_size, budget, neighbourhoods)
+    return child.timetable.cells, child.reached_students, stats
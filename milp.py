@@ -0,0 +1,185 @@
+import time
+from schedule import Schedule
+from schedule_data import ScheduleData, mask_ids
+from evaluator import MAX_PROFESSOR_HOURS
+from stats import SearchStats
+from progress import Progress
+from budget import Budget
+
+MILP_SOLVERS = ['cpsat', 'cbc'] # OR-Tools CP-SAT or CBC through PuLP, both optional
+
+
+class MILP:
+    """
+    Exact integer program of the problem: a binary variable for every (course, professor, cell) allowed by the
+    eligibility of the course, hard constraints as linear constraints and the violated preferences as objective,
+    solved by a locally installed solver
+    """
+
+    @staticmethod
+    def variables(schedule_data: ScheduleData):
+        """Returns the (course, professor, cell) triples which can be assigned"""
+        nr_classrooms = len(schedule_data.classroom_names)
+        nr_slots = len(schedule_data.day_names) * len(schedule_data.interval_names)
+        return [(course, professor, slot * nr_classrooms + classroom)
+                for course in range(len(schedule_data.course_names))
+                for professor in mask_ids(schedule_data.course_professors_mask[course])
+                for slot in range(nr_slots)
+                for classroom in schedule_data.course_classrooms[course]]
+
+    @staticmethod
+    def gap_pairs(schedule_data: ScheduleData, professor: int):
+        """
+        Returns the (first, last) interval pairs of a day forming a break longer than the professor accepts,
+        once for every '!Pauza > N' constraint they break
+        """
+        intervals = schedule_data.interval_names
+        return [(first, last) for threshold in schedule_data.gap_thresholds[professor]
+                for first in range(len(intervals)) for last in range(first + 1, len(intervals))
+                if intervals[last][0] - intervals[first][1] > threshold]
+
+    @staticmethod
+    def constraints(schedule_data: ScheduleData, variables: list):
+        """
+        Returns the linear model as lists of variable indexes: (indexes, coefficients, bound) rows meaning
+        sum <= bound, coverage rows meaning sum >= target, the preference cost of every variable and, for every
+        gap pair, the variables of its 2 ends and of the intervals between them
+        """
+        nr_classrooms = len(schedule_data.classroom_names)
+        nr_intervals = len(schedule_data.interval_names)
+        nr_days = len(schedule_data.day_names)
+        by_cell, by_course, by_professor, by_professor_slot = {}, {}, {}, {}
+        for index, (course, professor, cell) in enumerate(variables):
+            slot = cell // nr_classrooms
+            by_cell.setdefault(cell, []).append(index)
+            by_course.setdefault(course, []).append(index)
+            by_professor.setdefault(professor, []).append(index)
+            by_professor_slot.setdefault((professor, slot), []).append(index)
+
+        at_most = []
+        # a cell holds a single assignment
+        at_most.extend((indexes, [1] * len(indexes), 1) for indexes in by_cell.values())
+        # a professor teaches at most MAX_PROFESSOR_HOURS intervals, in a single classroom per interval
+        at_most.extend((indexes, [1] * len(indexes), MAX_PROFESSOR_HOURS) for indexes in by_professor.values())
+        at_most.extend((indexes, [1] * len(indexes), 1) for indexes in by_professor_slot.values())
+
+        # the classrooms of a course seat all its students
+        at_least = []
+        for course, name in enumerate(schedule_data.course_names):
+            indexes = by_course.get(course, [])
+            seats = [schedule_data.capacities[variables[index][2] % nr_classrooms] for index in indexes]
+            at_least.append((indexes, seats, schedule_data.courses[name]))
+
+        costs = [schedule_data.preference_penalties[professor][cell // nr_classrooms]
+                 for _, professor, cell in variables]
+
+        # a break is violated when both ends are taught and no interval between them is
+        gaps = []
+        for professor in range(len(schedule_data.professor_names)):
+            for first, last in MILP.gap_pairs(schedule_data, professor):
+                for day in range(nr_days):
+                    def taught(interval):
+                        return by_professor_slot.get((professor, day * nr_intervals + interval), [])
+                    gaps.append((taught(first), taught(last),
+                                 [index for interval in range(first + 1, last) for index in taught(interval)]))
+        return at_most, at_least, costs, gaps
+
+    @staticmethod
+    def solve_cpsat(variables: list, model: tuple, time_limit: float, workers: int):
+        """Solves the model with OR-Tools CP-SAT, returns the chosen variables, the cost, the bound and optimality"""
+        try:
+            from ortools.sat.python import cp_model
+        except ImportError:
+            raise ImportError('the cpsat backend needs OR-Tools, install it with pip install ortools')
+        at_most, at_least, costs, gaps = model
+        solver_model = cp_model.CpModel()
+        x = [solver_model.NewBoolVar(f'x{index}') for index in range(len(variables))]
+        for indexes, coefficients, bound in at_most:
+            solver_model.Add(sum(coefficient * x[index] for index, coefficient in zip(indexes, coefficients)) <= bound)
+        for indexes, coefficients, target in at_least:
+            solver_model.Add(sum(coefficient * x[index] for index, coefficient in zip(indexes, coefficients)) >= target)
+        objective = [cost * x[index] for index, cost in enumerate(costs) if cost != 0]
+        for number, (first, last, between) in enumerate(gaps):
+            gap = solver_model.NewBoolVar(f'gap{number}')
+            solver_model.Add(gap >= sum(x[index] for index in first) + sum(x[index] for index in last) - 1
+                             - sum(x[index] for index in between))
+            objective.append(gap)
+        solver_model.Minimize(sum(objective))
+
+        solver = cp_model.CpSolver()
+        if time_limit is not None:
+            solver.parameters.max_time_in_seconds = time_limit
+        solver.parameters.num_search_workers = workers
+        status = solver.Solve(solver_model)
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return None, None, None, status == cp_model.INFEASIBLE
+        chosen = [index for index in range(len(variables)) if solver.BooleanValue(x[index])]
+        return chosen, round(solver.ObjectiveValue()), round(solver.BestObjectiveBound()), status == cp_model.OPTIMAL
+
+    @staticmethod
+    def solve_cbc(variables: list, model: tuple, time_limit: float, workers: int):
+        """Solves the model with CBC through PuLP, returns the chosen variables, the cost, the bound and optimality"""
+        try:
+            import pulp
+        except ImportError:
+            raise ImportError('the cbc backend needs PuLP, install it with pip install pulp')
+        at_most, at_least, costs, gaps = model
+        problem = pulp.LpProblem('timetable', pulp.LpMinimize)
+        x = [pulp.LpVariable(f'x{index}', cat='Binary') for index in range(len(variables))]
+        objective = [cost * x[index] for index, cost in enumerate(costs) if cost != 0]
+        for number, (first, last, between) in enumerate(gaps):
+            gap = pulp.LpVariable(f'gap{number}', lowBound=0)
+            problem += gap >= pulp.lpSum(x[index] for index in first) + pulp.lpSum(x[index] for index in last) - 1\
+                - pulp.lpSum(x[index] for index in between)
+            objective.append(gap)
+        problem += pulp.lpSum(objective)
+        for indexes, coefficients, bound in at_most:
+            problem += pulp.lpSum(coefficient * x[index] for index, coefficient in zip(indexes, coefficients)) <= bound
+        for indexes, coefficients, target in at_least:
+            problem += pulp.lpSum(coefficient * x[index] for index, coefficient in zip(indexes, coefficients)) >= target
+
+        problem.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit, threads=workers))
+        if problem.sol_status not in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+            return None, None, None, problem.sol_status == pulp.LpSolutionInfeasible
+        chosen = [index for index in range(len(variables)) if (x[index].value() or 0) > 0.5]
+        cost = round(pulp.value(problem.objective) or 0)
+        # cbc stopped by the time limit returns its incumbent without a bound
+        optimal = problem.sol_status == pulp.LpSolutionOptimal
+        return chosen, cost, cost if optimal else None, optimal
+
+    @staticmethod
+    def algorithm(schedule_data: ScheduleData, stats: SearchStats = None, progress: Progress = None,
+                  solver: str = 'cbc', budget: Budget = None, workers: int = 1):
+        """
+        Returns the best schedule found (None if there is none), its cost, the proven lower bound (None if
+        unknown) and whether it is optimal. The solver stops at the deadline of the budget.
+        """
+        stats = stats if stats is not None else SearchStats()
+        progress = progress if progress is not None else Progress()
+        variables = MILP.variables(schedule_data)
+        model = MILP.constraints(schedule_data, variables)
+        stats.successors_generated += len(variables)
+
+        time_limit = None
+        if budget is not None and budget.deadline is not None:
+            time_limit = max(budget.deadline - time.time(), 0.01)
+        solve = MILP.solve_cpsat if solver == 'cpsat' else MILP.solve_cbc
+        chosen, cost, lower_bound, optimal = solve(variables, model, time_limit, workers)
+        if chosen is None:
+            return None, None, lower_bound, optimal
+
+        # the solution is replayed into a regular state, the largest classrooms of a course seated first
+        state = Schedule(schedule_data)
+        state.initialize_all_data()
+        nr_classrooms = len(schedule_data.classroom_names)
+        chosen_variables = sorted((variables[index] for index in chosen),
+                                  key=lambda variable: -schedule_data.capacities[variable[2] % nr_classrooms])
+        for course, professor, cell in chosen_variables:
+            day, interval, classroom = state.timetable.slot(cell)
+            state.assign_course(schedule_data.course_names[course], day, interval, classroom,
+                                schedule_data.professor_names[professor])
+        stats.states_materialized += 1
+        progress.improved(state, state.evaluator.soft_cost)
+        if lower_bound is not None:
+            progress.bounded(state.evaluator.soft_cost, lower_bound)
+        return state, state.evaluator.soft_cost, lower_bound, optimal
@@ -0,0 +1,141 @@
+from array import array
+from timetable import Timetable, EMPTY
+
+
+class Move:
+    """Small change of a timetable, recorded as cell writes against a parent state"""
+    def __init__(self, writes: list, carried: list):
+        # list of (cell, old assignment id, new assignment id)
+        self.writes = writes
+        # list of (source cell, target cell) for per-cell values travelling with the assignments
+        self.carried = carried
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.writes})'
+
+    def apply(self, timetable: Timetable):
+        """Applies the move on the timetable"""
+        for cell, _, new in self.writes:
+            timetable.write(cell, new)
+
+    def undo(self, timetable: Timetable):
+        """Restores the timetable to the state before the move was applied"""
+        for cell, old, _ in reversed(self.writes):
+            timetable.write(cell, old)
+
+    def zobrist_after(self, timetable: Timetable):
+        """Returns the hash the timetable would have after the move, without applying it"""
+        keys = timetable.schedule_data.zobrist_keys
+        zobrist = timetable.zobrist
+        for cell, old, new in self.writes:
+            if old != EMPTY:
+                zobrist ^= keys[cell * timetable.nr_assignments + old]
+            if new != EMPTY:
+                zobrist ^= keys[cell * timetable.nr_assignments + new]
+        return zobrist
+
+    def carry(self, values: array):
+        """Moves per-cell values (e.g. seated students) together with the assignments"""
+        moved = [values[source] for source, _ in self.carried]
+        for source, _ in self.carried:
+            values[source] = 0
+        for (_, target), value in zip(self.carried, moved):
+            values[target] = value
+
+    def uncarry(self, values: array):
+        """Moves per-cell values back to the cells they had before the move"""
+        moved = [values[target] for _, target in self.carried]
+        for _, target in self.carried:
+            values[target] = 0
+        for (source, _), value in zip(self.carried, moved):
+            values[source] = value
+
+
+class Relocate(Move):
+    """Moves an assignment from a cell to an empty cell"""
+    def __init__(self, timetable: Timetable, source: int, target: int):
+        assignment = timetable.cells[source]
+        super().__init__([(source, assignment, EMPTY), (target, EMPTY, assignment)], [(source, target)])
+        self.source = source
+        self.target = target
+
+
+class Swap(Move):
+    """Exchanges the assignments of two cells"""
+    def __init__(self, timetable: Timetable, first: int, second: int):
+        first_assignment = timetable.cells[first]
+        second_assignment = timetable.cells[second]
+        super().__init__([(first, first_assignment, second_assignment),
+                          (second, second_assignment, first_assignment)],
+                         [(first, second), (second, first)])
+        self.first = first
+        self.second = second
+
+
+class Reassign(Move):
+    """Gives the course of a cell to another professor"""
+    def __init__(self, timetable: Timetable, cell: int, professor: int):
+        assignment = timetable.cells[cell]
+        course = assignment % timetable.nr_courses
+        super().__init__([(cell, assignment, professor * timetable.nr_courses + course)], [])
+        self.cell = cell
+        self.professor = professor
+
+
+class SwapProfessors(Move):
+    """Exchanges the professors of two cells teaching the same course"""
+    def __init__(self, timetable: Timetable, first: int, second: int):
+        first_professor, course = timetable.get(first)
+        second_professor, _ = timetable.get(second)
+        first_assignment = timetable.cells[first]
+        second_assignment = timetable.cells[second]
+        super().__init__([(first, first_assignment, second_professor * timetable.nr_courses + course),
+                          (second, second_assignment, first_professor * timetable.nr_courses + course)], [])
+        self.first = first
+        self.second = second
+
+
+class KempeSwap(Move):
+    """
+    Exchanges two slots for the chain of classrooms reached from a cell: a classroom is added when it holds,
+    in either slot, a professor already moved by the chain, so no professor ends up teaching twice in a slot
+    """
+    def __init__(self, timetable: Timetable, cell: int, other_slot: int):
+        nr_classrooms = timetable.nr_classrooms
+        nr_courses = timetable.nr_courses
+        slot, classroom = divmod(cell, nr_classrooms)
+        first_start = slot * nr_classrooms
+        second_start = other_slot * nr_classrooms
+
+        classrooms = {classroom}
+        professors = set()
+        chain = [classroom]
+        while chain:
+            room = chain.pop()
+            for start in (first_start, second_start):
+                assignment = timetable.cells[start + room]
+                if assignment != EMPTY and assignment // nr_courses not in professors:
+                    professor = assignment // nr_courses
+                    professors.add(professor)
+                    # the classrooms where the professor teaches in either slot join the chain
+                    for other in range(nr_classrooms):
+                        if other in classrooms:
+                            continue
+                        for other_start in (first_start, second_start):
+                            other_assignment = timetable.cells[other_start + other]
+                            if other_assignment != EMPTY and other_assignment // nr_courses == professor:
+                                classrooms.add(other)
+                                chain.append(other)
+                                break
+
+        writes = []
+        carried = []
+        for room in sorted(classrooms):
+            first, second = first_start + room, second_start + room
+            first_assignment, second_assignment = timetable.cells[first], timetable.cells[second]
+            if first_assignment != second_assignment:
+                writes.extend([(first, first_assignment, second_assignment), (second, second_assignment, first_assignment)])
+                carried.extend([(first, second), (second, first)])
+        super().__init__(writes, carried)
+        self.cell = cell
+        self.other_slot = other_slot
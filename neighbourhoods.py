@@ -0,0 +1,219 @@
+from schedule import Schedule
+from schedule_data import mask_ids
+from timetable import EMPTY
+from moves import Relocate, Swap, Reassign, SwapProfessors, KempeSwap
+from stats import SearchStats
+from budget import Budget
+
+STRATEGIES = ['best', 'first'] # best improvement scans the whole neighbourhood, first stops at an improving move
+RANDOM_MOVE_NEIGHBOURHOODS = ['relocate', 'swap', 'reassign'] # random moves of sa, tabu and memetic by default
+
+
+class Neighbourhood:
+    """
+    Family of moves of a state: moves(state) yields every move in a fixed order, random_move(state) returns
+    a random one, or None if the random choice gives no move
+    """
+    name = None
+
+    @staticmethod
+    def assigned_cells(state: Schedule):
+        """Returns the cells holding an assignment"""
+        return [cell for cell, assignment in enumerate(state.timetable.cells) if assignment != EMPTY]
+
+
+class RelocateNeighbourhood(Neighbourhood):
+    """Moves an assignment to any empty cell"""
+    name = 'relocate'
+
+    def moves(self, state: Schedule):
+        cells = state.timetable.cells
+        empty = [cell for cell, assignment in enumerate(cells) if assignment == EMPTY]
+        for cell in Neighbourhood.assigned_cells(state):
+            for target in empty:
+                yield Relocate(state.timetable, cell, target)
+
+    def random_move(self, state: Schedule):
+        assigned = Neighbourhood.assigned_cells(state)
+        target = state.random.randrange(len(state.timetable.cells))
+        if len(assigned) == 0 or state.timetable.cells[target] != EMPTY:
+            return None
+        return Relocate(state.timetable, state.random.choice(assigned), target)
+
+
+class ChangeRoomNeighbourhood(Neighbourhood):
+    """Moves an assignment to an empty classroom of the same slot"""
+    name = 'room'
+
+    def moves(self, state: Schedule):
+        timetable = state.timetable
+        for cell in Neighbourhood.assigned_cells(state):
+            start = cell - cell % timetable.nr_classrooms
+            for target in range(start, start + timetable.nr_classrooms):
+                if timetable.cells[target] == EMPTY:
+                    yield Relocate(timetable, cell, target)
+
+    def random_move(self, state: Schedule):
+        timetable = state.timetable
+        assigned = Neighbourhood.assigned_cells(state)
+        if len(assigned) == 0:
+            return None
+        cell = state.random.choice(assigned)
+        target = cell - cell % timetable.nr_classrooms + state.random.randrange(timetable.nr_classrooms)
+        if timetable.cells[target] != EMPTY:
+            return None
+        return Relocate(timetable, cell, target)
+
+
+class SwapNeighbourhood(Neighbourhood):
+    """Exchanges the assignments of two cells"""
+    name = 'swap'
+
+    def moves(self, state: Schedule):
+        cells = state.timetable.cells
+        assigned = Neighbourhood.assigned_cells(state)
+        for index, first in enumerate(assigned):
+            for second in assigned[index + 1:]:
+                if cells[first] != cells[second]:
+                    yield Swap(state.timetable, first, second)
+
+    def random_move(self, state: Schedule):
+        assigned = Neighbourhood.assigned_cells(state)
+        if len(assigned) < 2:
+            return None
+        first, second = state.random.sample(assigned, 2)
+        if state.timetable.cells[first] == state.timetable.cells[second]:
+            return None
+        return Swap(state.timetable, first, second)
+
+
+class SwapProfessorsNeighbourhood(Neighbourhood):
+    """Exchanges the professors of two cells teaching the same course"""
+    name = 'professors'
+
+    def moves(self, state: Schedule):
+        timetable = state.timetable
+        assigned = Neighbourhood.assigned_cells(state)
+        for index, first in enumerate(assigned):
+            first_professor, course = timetable.get(first)
+            for second in assigned[index + 1:]:
+                second_professor, second_course = timetable.get(second)
+                if second_course == course and second_professor != first_professor:
+                    yield SwapProfessors(timetable, first, second)
+
+    def random_move(self, state: Schedule):
+        timetable = state.timetable
+        assigned = Neighbourhood.assigned_cells(state)
+        if len(assigned) < 2:
+            return None
+        first, second = state.random.sample(assigned, 2)
+        first_professor, course = timetable.get(first)
+        second_professor, second_course = timetable.get(second)
+        if second_course != course or second_professor == first_professor:
+            return None
+        return SwapProfessors(timetable, first, second)
+
+
+class ReassignNeighbourhood(Neighbourhood):
+    """Gives the course of a cell to another professor teaching it"""
+    name = 'reassign'
+
+    def moves(self, state: Schedule):
+        timetable = state.timetable
+        for cell in Neighbourhood.assigned_cells(state):
+            professor, course = timetable.get(cell)
+            for other in mask_ids(state.schedule_data.course_professors_mask[course]):
+                if other != professor:
+                    yield Reassign(timetable, cell, other)
+
+    def random_move(self, state: Schedule):
+        timetable = state.timetable
+        assigned = Neighbourhood.assigned_cells(state)
+        if len(assigned) == 0:
+            return None
+        cell = state.random.choice(assigned)
+        professor, course = timetable.get(cell)
+        professors = [other for other in mask_ids(state.schedule_data.course_professors_mask[course])
+                      if other != professor]
+        if len(professors) == 0:
+            return None
+        return Reassign(timetable, cell, state.random.choice(professors))
+
+
+class KempeNeighbourhood(Neighbourhood):
+    """Exchanges two slots for the chain of classrooms linked by the professors of a cell"""
+    name = 'kempe'
+
+    def moves(self, state: Schedule):
+        nr_slots = state.timetable.nr_days * state.timetable.nr_intervals
+        for cell in Neighbourhood.assigned_cells(state):
+            slot = cell // state.timetable.nr_classrooms
+            for other_slot in range(nr_slots):
+                if other_slot != slot:
+                    yield KempeSwap(state.timetable, cell, other_slot)
+
+    def random_move(self, state: Schedule):
+        assigned = Neighbourhood.assigned_cells(state)
+        nr_slots = state.timetable.nr_days * state.timetable.nr_intervals
+        if len(assigned) == 0:
+            return None
+        cell = state.random.choice(assigned)
+        other_slot = state.random.randrange(nr_slots)
+        if other_slot == cell // state.timetable.nr_classrooms:
+            return None
+        return KempeSwap(state.timetable, cell, other_slot)
+
+
+NEIGHBOURHOODS = {neighbourhood.name: neighbourhood for neighbourhood in
+                  [RelocateNeighbourhood, ChangeRoomNeighbourhood, SwapNeighbourhood, SwapProfessorsNeighbourhood,
+                   ReassignNeighbourhood, KempeNeighbourhood]}
+
+
+class NeighbourhoodSearch:
+    """
+    Selects the move of a local search step from a set of neighbourhoods, each move scored by its
+    (hard, soft) cost change computed incrementally, without copying the state
+    """
+    def __init__(self, names: list, strategy: str = 'best', sample_size: int = None):
+        self.neighbourhoods = [NEIGHBOURHOODS[name]() for name in names]
+        self.strategy = strategy
+        self.sample_size = sample_size # None to enumerate the neighbourhoods fully
+
+    def candidates(self, state: Schedule):
+        """Yields the moves of all the neighbourhoods, or sample_size random ones"""
+        if self.sample_size is None:
+            for neighbourhood in self.neighbourhoods:
+                yield from neighbourhood.moves(state)
+            return
+        for _ in range(self.sample_size):
+            move = self.random_move(state)
+            if move is not None:
+                yield move
+
+    def random_move(self, state: Schedule):
+        """Returns a random move of a random neighbourhood, or None if the random choice gives no move"""
+        return state.random.choice(self.neighbourhoods).random_move(state)
+
+    def select(self, state: Schedule, stats: SearchStats = None, budget: Budget = None):
+        """
+        Returns the improving move chosen by the strategy and the number of evaluated moves, or None.
+        The evaluated moves are counted in the stats as they are scored, and the budget is checked after every
+        one of them, so an exhausted budget returns the best move found so far.
+        """
+        best_move = None
+        best_delta = (0, 0)
+        evaluated = 0
+        for move in self.candidates(state):
+            evaluated += 1
+            if stats is not None:
+                stats.successors_generated += 1
+            delta = state.evaluator.delta(move)
+            # hard constraints can't get worse, then the soft cost has to decrease
+            if delta[0] <= 0 and delta < best_delta:
+                best_move = move
+                best_delta = delta
+                if self.strategy == 'first':
+                    break
+            if budget is not None and budget.exhausted(stats):
+                break
+        return best_move, evaluated
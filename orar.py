@@ -1,21 +1,45 @@
-import sys
+import argparse
 from utils import read_yaml_file, pretty_print_timetable
-from schedule import Schedule
+from schedule import Schedule, INITIAL_STATES
 from schedule_data import ScheduleData
 from professor import Professor
 from classroom import Classroom        
 from hc import HillClimbing
 from astar import AStar
+from csp import CSP
+from bnb import BranchAndBound
+from sa import SimulatedAnnealing, COOLING_SCHEDULES
+from tabu import TabuSearch
+from memetic import MemeticAlgorithm
+from milp import MILP, MILP_SOLVERS
+from neighbourhoods import NeighbourhoodSearch, NEIGHBOURHOODS, STRATEGIES
 from check_constraints import check_optional_constraints, check_mandatory_constraints
 import os
+import sys
 import time
+import pickle
+import hashlib
+import random
+from manifest import RunManifest, file_hash
+from stats import SearchStats
+from progress import make_progress
+from transposition import TranspositionTable
+from budget import Budget
+from checkpoint import Checkpoint, load_checkpoint
+
+MODEL_CACHE_DIR = '.model_cache' # compiled problem models, one per input file path
+MODEL_SOURCES = ['orar.py', 'schedule_data.py', 'professor.py', 'classroom.py'] # code compiling the problem model
         
 
-def parse_input_file(input_file: str):
-    """Parses the input file and returns a Schedule object"""
+def parse_interval(interval: str):
+    """Parses an interval like '(8, 10)' into a tuple of ints"""
+    return tuple(int(hour) for hour in interval.strip('()').split(','))
+
+def compile_input_file(input_file: str):
+    """Parses the input file and returns the compiled ScheduleData"""
     data = read_yaml_file(input_file)
     
-    intervals = [eval(interval) for interval in data['Intervale']]
+    intervals = [parse_interval(interval) for interval in data['Intervale']]
     
     courses = {name: student_count for name, student_count in data['Materii'].items()}
     
@@ -42,43 +66,344 @@ def parse_input_file(input_file: str):
     
     days = data['Zile']
     schedule_data = ScheduleData(professors, classrooms, courses, intervals, days, data)
-    
-    for classroom in schedule_data.classrooms:
-        schedule_data.classrooms[classroom].initialize_slot_reached_students(schedule_data)
     return schedule_data
 
+def model_hash(input_file: str):
+    """Hash of the input file and of the code compiling it, used as key of the cached problem model"""
+    digest = hashlib.sha256(file_hash(input_file).encode())
+    for source in MODEL_SOURCES:
+        digest.update(file_hash(os.path.join(os.path.dirname(os.path.abspath(__file__)), source)).encode())
+    return digest.hexdigest()
+
+def parse_input_file(input_file: str, cache_dir: str = MODEL_CACHE_DIR):
+    """
+    Returns the compiled ScheduleData of the input file, loaded from the cache if it was already compiled.
+    The cache keeps a single model per input file, overwritten when the input or the code compiling it changes.
+    """
+    if cache_dir is None:
+        return compile_input_file(input_file)
+
+    path_hash = hashlib.sha256(os.path.abspath(input_file).encode()).hexdigest()
+    cache_file = os.path.join(cache_dir, f'{path_hash}.pickle')
+    key = model_hash(input_file)
+    if os.path.exists(cache_file):
+        with open(cache_file, 'rb') as file:
+            cached_key, schedule_data = pickle.load(file)
+        if cached_key == key:
+            return schedule_data
+
+    schedule_data = compile_input_file(input_file)
+    os.makedirs(cache_dir, exist_ok=True)
+    # writing to a temporary file first so that concurrent runs never read a partial model
+    temporary_file = f'{cache_file}.{os.getpid()}'
+    with open(temporary_file, 'wb') as file:
+        pickle.dump((key, schedule_data), file)
+    os.replace(temporary_file, cache_file)
+    return schedule_data
+
+def parse_arguments():
+    """Parses the command line arguments, returns the parser, to report later errors, and the arguments"""
+    parser = argparse.ArgumentParser(description='Timetable scheduling')
+    parser.add_argument('algo', choices=['astar', 'hc', 'csp', 'bnb', 'sa', 'tabu', 'memetic', 'milp'], help='search algorithm')
+    parser.add_argument('input_file', help='yaml input file')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of processes running hill climbing restarts or memetic children in parallel')
+    parser.add_argument('--progress', choices=['silent', 'periodic', 'trace'], default='periodic',
+                        help='progress reporting: nothing, a periodic summary or every expanded timetable')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='parse the input file again instead of loading the cached problem model')
+    parser.add_argument('--init', choices=INITIAL_STATES, default=None,
+                        help='constructor of the initial states: random retries or greedy by course scarcity '
+                             '(default greedy for memetic, random otherwise)')
+    parser.add_argument('--max-nodes', type=int, default=None,
+                        help='nodes expanded by branch and bound before returning the incumbent')
+    parser.add_argument('--tt-memory', type=float, default=64,
+                        help='megabytes of the transposition table of astar and hc, 0 to disable it (hc only)')
+    parser.add_argument('--cooling', choices=COOLING_SCHEDULES, default='adaptive',
+                        help='temperature schedule of simulated annealing')
+    parser.add_argument('--time-limit', type=float, default=None,
+                        help='seconds after which the search returns the best state found')
+    parser.add_argument('--max-evals', type=int, default=None,
+                        help='evaluated successors (moves or values) after which the search returns the best state found (not milp)')
+    parser.add_argument('--checkpoint', default=None,
+                        help='file where the best state found is saved periodically')
+    parser.add_argument('--checkpoint-every', type=float, default=10,
+                        help='seconds between two writes of the checkpoint')
+    parser.add_argument('--resume', default=None,
+                        help='checkpoint whose state is the initial state (the incumbent for bnb) of the search')
+    parser.add_argument('--tabu-tenure', type=int, default=10,
+                        help='iterations during which a professor can\'t return to a slot it left in tabu search')
+    parser.add_argument('--neighbourhoods', nargs='+', choices=list(NEIGHBOURHOODS), default=None,
+                        help='move neighbourhoods of hill climbing, instead of its default successors, and of the '
+                             'random moves of sa, tabu and memetic, instead of relocate, swap and reassign')
+    parser.add_argument('--strategy', choices=STRATEGIES, default='best',
+                        help='hill climbing step over the neighbourhoods: best or first improving move')
+    parser.add_argument('--sample', type=int, default=None,
+                        help='random moves evaluated at every hill climbing step, instead of the whole neighbourhoods')
+    parser.add_argument('--population', type=int, default=20,
+                        help='number of timetables kept by the memetic search')
+    parser.add_argument('--generations', type=int, default=200,
+                        help='generations of the memetic search')
+    parser.add_argument('--milp-solver', choices=MILP_SOLVERS, default='cbc',
+                        help='solver of the integer program: OR-Tools CP-SAT or CBC through PuLP')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed of the random number generators, to make runs reproducible')
+    args = parser.parse_args()
+    if args.resume is not None and args.algo in ('csp', 'milp'):
+        parser.error(f'{args.algo} searches from an empty timetable and can\'t resume a checkpoint')
+    if args.algo == 'milp' and args.max_evals is not None:
+        parser.error('milp hands the whole model to the solver, only --time-limit bounds its search')
+    if args.algo == 'astar' and args.tt_memory <= 0:
+        parser.error('astar keeps its discovered states in the transposition table, --tt-memory has to be positive')
+    if args.init is None:
+        # the memetic search builds a whole population, the greedy constructor is much faster
+        args.init = 'greedy' if args.algo == 'memetic' else 'random'
+    return parser, args
+
+def create_initial_state(schedule_data: ScheduleData, seed: int, init: str, stats: SearchStats, resumed: Schedule):
+    """
+    Returns the resumed state if there is one, otherwise a new initial state built by the init constructor,
+    or None when the constructor finds no valid state
+    """
+    if resumed is not None:
+        return resumed
+    initial_state = Schedule(schedule_data, random.Random(seed))
+    try:
+        initial_state.create_state(init)
+    except ValueError as error:
+        print(error)
+        return None
+    finally:
+        stats.construction_retries += initial_state.construction_retries
+    return initial_state
+
+def write_no_solution(message: str):
+    """Prints why no schedule was found and writes it to the output file, like csp and bnb"""
+    print(message)
+    with open('output.txt', 'w') as file:
+        file.write("No solution found")
+
 if __name__ == '__main__':
-    algo = sys.argv[1]
-    input_file = sys.argv[2]
+    parser, args = parse_arguments()
+    algo = args.algo
+    input_file = args.input_file
+    # a run without a seed gets a random one, recorded in the manifest to be repeatable
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    manifest = RunManifest(algo, input_file, seed, workers=args.workers, init=args.init, tt_memory=args.tt_memory,
+                           population=args.population, generations=args.generations, milp_solver=args.milp_solver,
+                           neighbourhoods=args.neighbourhoods, strategy=args.strategy, sample=args.sample,
+                           time_limit=args.time_limit, max_evals=args.max_evals, checkpoint=args.checkpoint,
+                           resume=args.resume)
+    stats = SearchStats()
 
-    schedule_data = parse_input_file(input_file)
+    with manifest.phase('parse'):
+        schedule_data = parse_input_file(input_file, None if args.no_cache else MODEL_CACHE_DIR)
+    progress = make_progress(args.progress, schedule_data)
+    if args.checkpoint is not None:
+        progress = Checkpoint(args.checkpoint, manifest.data['input_hash'], algo, progress, args.checkpoint_every)
+    resumed = None
+    if args.resume is not None:
+        try:
+            resumed, resumed_cost = load_checkpoint(args.resume, schedule_data, manifest.data['input_hash'],
+                                                    random.Random(seed))
+        except ValueError as error:
+            parser.error(str(error))
+        print("Resuming from cost: ", resumed_cost)
+    # the budget of the run starts once the input is parsed
+    budget = Budget(args.time_limit, args.max_evals)
+    # a disabled table keeps nothing; astar keeps the parent and the cells of its expanded states in the
+    # table, so they are counted in its memory budget
+    if algo == 'astar':
+        table = AStar.table_with_memory(args.tt_memory, schedule_data)
+    else:
+        table = TranspositionTable.with_memory(args.tt_memory) if args.tt_memory > 0 else TranspositionTable(0)
     
     if os.path.exists('output.txt'):
         os.remove('output.txt')
     
 
+    # astar, sa and tabu search from a single initial state
+    initial_state = None
+    if algo in ('astar', 'sa', 'tabu'):
+        with manifest.phase('initial_state'):
+            initial_state = create_initial_state(schedule_data, seed, args.init, stats, resumed)
+
     # check arguments
-    if algo == 'astar':
-        initial_state = Schedule(schedule_data)
-        initial_state.create_initial_state()
+    if algo in ('astar', 'sa', 'tabu') and initial_state is None:
+        best_state = None
+        write_no_solution("The problem has no solution")
+
+    elif algo == 'astar':
         start_time = time.time()
-        result, best_cost = AStar.algorithm(initial_state, input_file)
+        with manifest.phase('search'):
+            result, best_cost, expanded = AStar.algorithm(initial_state, stats, progress, table, budget)
+        manifest.update(iterations=expanded, restarts=0)
+        
+        with manifest.phase('output'):
+            if len(result) > 0:
+                best_state = result[-1]
+                best_cost = check_optional_constraints(best_state.days, initial_state.specs)
+                print(best_cost)
+                with open('output.txt', 'w') as file:
+                    file.write(pretty_print_timetable(best_state.timetable, schedule_data))
+                    file.write(f'\nCost: {best_cost}')
+                    file.write(f'\nExecution time: {time.time() - start_time}')
+            else:
+                best_state = None
+                with open('output.txt', 'w') as file:
+                    file.write("No solution found")
         
-        if len(result) > 0:
-            best_cost = check_optional_constraints(result[-1].days, initial_state.specs)
-            print(best_cost)
+    elif algo == 'hc':
+        local_search = None
+        if args.neighbourhoods is not None:
+            local_search = NeighbourhoodSearch(args.neighbourhoods, args.strategy, args.sample)
+        start_time = time.time()
+        with manifest.phase('search'):
+            try:
+                best_state, best_cost, iterations, restarts = HillClimbing.random_restart_hill_climbing(
+                    start_time, schedule_data=schedule_data, workers=args.workers, seed=seed,
+                    stats=stats, progress=progress, init=args.init, table=table,
+                    local_search=local_search, budget=budget, initial_state=resumed)
+            except ValueError as error:
+                # a restart found no valid initial state
+                print(error)
+                best_state, iterations, restarts = None, 0, 0
+        manifest.update(iterations=iterations, restarts=restarts)
+        if best_state is None:
+            write_no_solution("The problem has no solution")
+
+    elif algo == 'csp':
+        start_time = time.time()
+        with manifest.phase('search'):
+            best_state, expanded = CSP.algorithm(schedule_data, stats, progress, budget)
+        manifest.update(iterations=expanded, restarts=0)
+
+        with manifest.phase('output'):
+            with open('output.txt', 'w') as file:
+                if best_state is not None:
+                    best_cost = check_optional_constraints(best_state.timetable, schedule_data.specs)
+                    print(best_cost)
+                    file.write(pretty_print_timetable(best_state.timetable, schedule_data))
+                    file.write(f'\nCost: {best_cost}')
+                    file.write(f'\nExecution time: {time.time() - start_time}')
+                elif budget.exhausted(stats):
+                    print("Budget exhausted before a solution was found")
+                    file.write("No solution found")
+                else:
+                    # the whole search space was explored
+                    print("The problem has no solution")
+                    file.write("No solution found")
+
+    elif algo in ('sa', 'tabu'):
+        start_time = time.time()
+        with manifest.phase('search'):
+            if algo == 'sa':
+                best_state, best_cost, iterations = SimulatedAnnealing.algorithm(
+                    initial_state, stats, progress, budget=budget, cooling=args.cooling,
+                    neighbourhoods=args.neighbourhoods)
+            else:
+                best_state, best_cost, iterations = TabuSearch.algorithm(
+                    initial_state, stats, progress, budget=budget, tenure=args.tabu_tenure,
+                    neighbourhoods=args.neighbourhoods)
+        manifest.update(iterations=iterations, restarts=0)
+
+        with manifest.phase('output'):
+            print("Final cost: ", best_cost)
             with open('output.txt', 'w') as file:
-                file.write(pretty_print_timetable(result[-1].days, input_file))
+                file.write(pretty_print_timetable(best_state.timetable, schedule_data))
                 file.write(f'\nCost: {best_cost}')
-                file.write(f'\nExecution time: {time.time() - start_time}')
-        else:
+                file.write(f'\nElapsed time: {time.time() - start_time}')
+
+    elif algo == 'memetic':
+        start_time = time.time()
+        with manifest.phase('search'):
+            try:
+                best_state, best_cost, generations = MemeticAlgorithm.algorithm(
+                    schedule_data, stats, progress, population_size=args.population, generations=args.generations,
+                    seed=seed, init=args.init, workers=args.workers, budget=budget, initial_state=resumed,
+                    neighbourhoods=args.neighbourhoods)
+            except ValueError as error:
+                # an individual found no valid initial state
+                print(error)
+                best_state, generations = None, 0
+        manifest.update(iterations=generations, restarts=0)
+
+        with manifest.phase('output'):
+            if best_state is None:
+                write_no_solution("The problem has no solution")
+            else:
+                print("Final cost: ", best_cost)
+                with open('output.txt', 'w') as file:
+                    file.write(pretty_print_timetable(best_state.timetable, schedule_data))
+                    file.write(f'\nCost: {best_cost}')
+                    file.write(f'\nElapsed time: {time.time() - start_time}')
+
+    elif algo == 'milp':
+        start_time = time.time()
+        with manifest.phase('search'):
+            try:
+                best_state, best_cost, lower_bound, optimal = MILP.algorithm(
+                    schedule_data, stats, progress, args.milp_solver, budget, args.workers)
+            except ImportError as error:
+                # the solver backends are optional dependencies
+                sys.exit(f'orar.py: error: {error}')
+        manifest.update(iterations=0, restarts=0, lower_bound=lower_bound, optimal=optimal)
+
+        with manifest.phase('output'):
             with open('output.txt', 'w') as file:
-                file.write("No solution found")
-        
-    elif algo == 'hc':
+                if best_state is not None:
+                    print("Cost: ", best_cost, "Lower bound: ", lower_bound, "Optimal: ", optimal)
+                    file.write(pretty_print_timetable(best_state.timetable, schedule_data))
+                    file.write(f'\nCost: {best_cost}')
+                    file.write(f'\nLower bound: {lower_bound}')
+                    file.write(f'\nExecution time: {time.time() - start_time}')
+                elif optimal:
+                    print("The problem has no solution")
+                    file.write("No solution found")
+                else:
+                    print("No solution found before the time limit")
+                    file.write("No solution found")
+
+    elif algo == 'bnb':
+        with manifest.phase('initial_state'):
+            # a resumed or greedy schedule is the first incumbent, when the constructor finds one
+            incumbent = resumed
+            if incumbent is None:
+                incumbent = Schedule(schedule_data, random.Random(seed))
+                found = incumbent.create_greedy_state()
+                stats.construction_retries += incumbent.construction_retries
+                if not found:
+                    incumbent = None
         start_time = time.time()
-        HillClimbing.random_restart_hill_climbing(start_time, input_file=input_file, schedule_data=schedule_data)
-        # pretty_print_timetable(schedule.days, input_file)
-        
+        with manifest.phase('search'):
+            best_state, best_cost, lower_bound, history = BranchAndBound.algorithm(
+                schedule_data, stats, progress, args.max_nodes, incumbent, budget)
+        manifest.update(iterations=stats.states_expanded, restarts=0, lower_bound=lower_bound, incumbents=history)
+
+        with manifest.phase('output'):
+            with open('output.txt', 'w') as file:
+                if best_state is not None:
+                    print("Cost: ", best_cost, "Lower bound: ", lower_bound, "Gap: ", best_cost - lower_bound)
+                    file.write(pretty_print_timetable(best_state.timetable, schedule_data))
+                    file.write(f'\nCost: {best_cost}')
+                    file.write(f'\nLower bound: {lower_bound}')
+                    file.write(f'\nExecution time: {time.time() - start_time}')
+                elif budget.exhausted(stats) or (args.max_nodes is not None and stats.states_expanded >= args.max_nodes):
+                    print("No solution found before the node limit or the budget")
+                    file.write("No solution found")
+                else:
+                    # the whole search space was explored
+                    print("The problem has no solution")
+                    file.write("No solution found")
 
-    
\ No newline at end of file
+    if args.checkpoint is not None:
+        # the last best state is saved even if the period didn't elapse
+        progress.flush()
+    manifest.update(budget_exhausted=budget.exhausted(stats), **stats.as_dict())
+    if algo in ('astar', 'hc'):
+        manifest.update(**table.as_dict())
+    if best_state is not None:
+        manifest.update(cost=best_cost,
+                        hard_constraints_violated=check_mandatory_constraints(best_state.days, schedule_data.specs),
+                        soft_constraints_violated=check_optional_constraints(best_state.days, schedule_data.specs))
+    manifest.write('output.txt')
@@ -3,8 +3,6 @@ class Professor:
     def __init__(self, preferences: list, courses: list):
         self.preferences = preferences
         self.courses = courses
-        self.nr_teaching_intervals = 0 # used to check if a professor reached 7 intervals per week
-        self.already_assigned = False # switching to True when a professor is assigned to 7 intervals
     
     def parse_interval(self, interval: str):
         """Parses the interval string and returns a list of time slots covered by this interval."""
@@ -27,25 +25,3 @@ class Professor:
                 # day prefs
                 refactored_preferences.append(pref)
         self.preferences = refactored_preferences
-    
-    def increment_nr_teaching_intervals(self):
-        """Increments the number of teaching intervals"""
-        self.nr_teaching_intervals += 1
-        if self.nr_teaching_intervals == 7:
-            self.already_assigned = True
-    
-    def decrement_nr_teaching_intervals(self):
-        """Decrements the number of teaching intervals"""
-        self.nr_teaching_intervals -= 1
-        if self.nr_teaching_intervals < 7:
-            self.already_assigned = False
-    
-    @staticmethod
-    def already_teaching_in_interval(name: str, schedule: dict, day: str, interval: str):
-        """Checks if the professor is already teaching in an interval"""
-        for classroom in schedule[day][interval]:
-            if schedule[day][interval][classroom]:
-                prof = schedule[day][interval][classroom][0]
-                if prof == name:
-                    return True
-        return False
@@ -0,0 +1,69 @@
+import time
+from schedule_data import ScheduleData
+from utils import pretty_print_timetable
+from check_constraints import check_optional_constraints
+
+
+class Progress:
+    """Receives the events of a search; this base class ignores them, for silent runs"""
+    def expanded(self, state, nr_expanded: int, best_cost: float):
+        """Called for every state whose successors are generated"""
+
+    def pushed(self, state):
+        """Called for every successor kept by the search (e.g. pushed on the A* frontier)"""
+
+    def improved(self, state, cost: float):
+        """Called when the search finds a new best state"""
+
+    def bounded(self, best_cost: float, lower_bound: float):
+        """Called by optimizing searches when the incumbent or the proven lower bound changes"""
+
+
+class PeriodicProgress(Progress):
+    """Prints a one line summary of the search at most once every period seconds"""
+    def __init__(self, period: float = 5.0):
+        self.period = period
+        self.start_time = time.time()
+        self.last_print = self.start_time
+
+    def expanded(self, state, nr_expanded: int, best_cost: float):
+        now = time.time()
+        if now - self.last_print >= self.period:
+            self.last_print = now
+            print(f'[{now - self.start_time:.1f}s] expanded {nr_expanded} states, best cost {best_cost}')
+
+    def improved(self, state, cost: float):
+        print(f'[{time.time() - self.start_time:.1f}s] new best cost {cost}')
+
+    def bounded(self, best_cost: float, lower_bound: float):
+        print(f'[{time.time() - self.start_time:.1f}s] incumbent {best_cost}, lower bound {lower_bound}, '
+              f'gap {best_cost - lower_bound}')
+
+
+class TraceProgress(Progress):
+    """Prints the timetable of every expanded state and the cost of every kept successor, for debugging"""
+    def __init__(self, schedule_data: ScheduleData):
+        self.schedule_data = schedule_data
+
+    def expanded(self, state, nr_expanded: int, best_cost: float):
+        print(pretty_print_timetable(state.timetable, self.schedule_data))
+
+    def pushed(self, state):
+        print(check_optional_constraints(state.timetable, state.specs))
+
+    def improved(self, state, cost: float):
+        print("CHANGED STATE!", "New cost: ", cost)
+        print(pretty_print_timetable(state.timetable, self.schedule_data))
+        print("Violated optional constraints: ", check_optional_constraints(state.timetable, state.specs))
+
+    def bounded(self, best_cost: float, lower_bound: float):
+        print("Incumbent: ", best_cost, "Lower bound: ", lower_bound)
+
+
+def make_progress(mode: str, schedule_data: ScheduleData):
+    """Returns the progress channel for a command line mode: silent, periodic or trace"""
+    if mode == 'trace':
+        return TraceProgress(schedule_data)
+    if mode == 'periodic':
+        return PeriodicProgress()
+    return Progress()
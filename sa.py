@@ -0,0 +1,103 @@
+import math
+from schedule import Schedule
+from stats import SearchStats
+from progress import Progress
+from budget import Budget
+from neighbourhoods import NeighbourhoodSearch, RANDOM_MOVE_NEIGHBOURHOODS
+
+COOLING_SCHEDULES = ['geometric', 'adaptive'] # how the temperature decreases after every step
+
+
+class SimulatedAnnealing:
+    """
+    Simulated annealing over the moves of the hill climbing successors and random moves of any assignment,
+    applied in place and evaluated by the incremental evaluator; worse moves are accepted with probability
+    exp(-delta / temperature)
+    """
+
+    @staticmethod
+    def initial_temperature(state: Schedule, acceptance: float = 0.8, samples: int = 20):
+        """Temperature accepting the average worsening move of the initial state with the given probability"""
+        worsening = []
+        for _ in range(samples):
+            for move in state.successor_moves():
+                hard_delta, soft_delta = state.evaluator.delta(move)
+                if hard_delta <= 0 and soft_delta > 0:
+                    worsening.append(soft_delta)
+            state.invalidate() # new random moves at every sample
+        if len(worsening) == 0:
+            return 1.0
+        return -(sum(worsening) / len(worsening)) / math.log(acceptance)
+
+    @staticmethod
+    def algorithm(initial_state: Schedule, stats: SearchStats = None, progress: Progress = None,
+                  max_iterations: int = 100000, budget: Budget = None, cooling: str = 'adaptive',
+                  temperature: float = None, alpha: float = 0.995, target_acceptance: float = 0.3,
+                  reheat_after: int = 1000, neighbourhoods: list = None):
+        """
+        Returns the best state found, its cost and the number of iterations.
+        Geometric cooling multiplies the temperature by alpha after every step; adaptive cooling also
+        moves the acceptance rate of the last steps towards target_acceptance. After reheat_after steps
+        without a new best state, the search goes back to the best state and the temperature to its initial value.
+        """
+        stats = stats if stats is not None else SearchStats()
+        progress = progress if progress is not None else Progress()
+        random_moves = NeighbourhoodSearch(neighbourhoods or RANDOM_MOVE_NEIGHBOURHOODS)
+
+        state = initial_state
+        rng = state.random
+        initial_temperature = temperature if temperature is not None else SimulatedAnnealing.initial_temperature(state)
+        temperature = initial_temperature
+        best_state = state.copy()
+        best_cost = state.evaluator.soft_cost
+        progress.improved(best_state, best_cost)
+
+        window = 100 # steps over which the adaptive cooling measures the acceptance rate
+        accepted = 0
+        since_best = 0
+        iters = 0
+        while iters < max_iterations and best_cost > 0:
+            if budget is not None and budget.exhausted(stats):
+                break
+            iters += 1
+
+            moves = state.successor_moves()
+            stats.states_expanded += 1
+            stats.successors_generated += len(moves)
+            progress.expanded(state, iters, best_cost)
+
+            # the successors only move violated preferences, random moves let the search leave their local optima
+            if len(moves) != 0 and rng.random() < 0.5:
+                move = rng.choice(moves)
+            else:
+                move = random_moves.random_move(state)
+                if move is None:
+                    continue
+                stats.successors_generated += 1
+            hard_delta, soft_delta = state.evaluator.delta(move)
+            # moves breaking hard constraints are never accepted
+            if hard_delta <= 0 and (soft_delta <= 0 or rng.random() < math.exp(-soft_delta / temperature)):
+                state.apply_move(move)
+                accepted += 1
+
+            if state.evaluator.soft_cost < best_cost:
+                best_cost = state.evaluator.soft_cost
+                best_state = state.copy()
+                stats.states_materialized += 1
+                progress.improved(best_state, best_cost)
+                since_best = 0
+            else:
+                since_best += 1
+
+            temperature *= alpha
+            if cooling == 'adaptive' and iters % window == 0:
+                # cooling slower when too few moves are accepted, faster when too many are
+                temperature *= 1.1 if accepted / window < target_acceptance else 0.9
+                accepted = 0
+
+            if since_best >= reheat_after:
+                state = best_state.copy()
+                temperature = initial_temperature
+                since_best = 0
+
+        return best_state, best_cost, iters
@@ -1,187 +1,298 @@
+import heapq
 import random
-from schedule_data import ScheduleData
-import copy
-from check_constraints import check_mandatory_constraints, check_optional_constraints
-from professor import Professor
+from array import array
+from schedule_data import ScheduleData, mask_ids
+from timetable import Timetable, EMPTY
+from moves import Move, Relocate, Swap, Reassign
+from evaluator import ConstraintEvaluator, MAX_PROFESSOR_HOURS
+
+INITIAL_STATES = ['random', 'greedy'] # constructors of the initial state
 
 class Schedule:
     """Schedule class"""
-    def __init__(self, schedule_data: ScheduleData):
+    def __init__(self, schedule_data: ScheduleData, rng: random.Random = None):
         """Constructor for Schedule class"""
-        
+
+        # random number generator of the state, seeded to make runs reproducible
+        self.random = rng if rng is not None else random.Random()
+
         self.specs = schedule_data.specs # used for checking constraints
-        
+
         # actual data of the schedule
         self.schedule_data = schedule_data
         # dictionary of courses and number of students left to assign
         self.students_left = None
         # dictionary of violated constraints
         self.violated_constraints = {prof: [] for prof in schedule_data.professors}
-        # dictionary of days and intervals
-        self.days = {}
-    
+        # compact grid of (professor, course) assignments indexed by day, interval and classroom ids
+        self.timetable = Timetable(schedule_data)
+        # hard and soft constraints counters of the timetable, updated incrementally
+        self.evaluator = ConstraintEvaluator(self.timetable)
+        # number of students seated in every cell of the timetable
+        self.reached_students = array('i', [0]) * len(self.timetable.cells)
+        # number of dead ends restarted by the greedy constructor of the initial state
+        self.construction_retries = 0
+        # values computed once per state, until the state is changed
+        self.cached_heuristic = None
+        self.violated_constraints_stale = True
+
     def __lt__(self, other):
         return self.heuristic() < other.heuristic()
-    
+
     def __eq__(self, other):
-        return self.days == other.days
-    
+        return self.timetable == other.timetable
+
     def __hash__(self):
-        return hash(str(self.days))
-    
+        return hash(self.timetable)
+
     def state_hash(self):
-        return str(self.days)
-        
-    def add_violated_constraint(self, professor: str, day: str, interval: tuple):
+        """64 bit zobrist hash of the timetable, updated incrementally by every write"""
+        return self.timetable.zobrist
+
+    @property
+    def days(self):
+        """Legacy view of the timetable: day -> interval -> classroom -> (professor, course) or None"""
+        return self.timetable.to_dict()
+
+    @days.setter
+    def days(self, days: dict):
+        self.set_timetable(Timetable.from_dict(days, self.schedule_data))
+
+    def invalidate(self):
+        """Drops the values cached for the state, called by every change of the timetable or of the students"""
+        self.cached_heuristic = None
+        self.violated_constraints_stale = True
+
+    def set_timetable(self, timetable: Timetable):
+        """Replaces the timetable of the schedule and rebuilds the data depending on it"""
+        self.invalidate()
+        self.timetable = timetable
+        self.evaluator = ConstraintEvaluator(self.timetable)
+        self.students_left = {course: 0 for course in self.schedule_data.courses}
+        # without other information, every assigned classroom is considered full
+        self.reached_students = array('i', [self.schedule_data.capacities[self.timetable.slot(cell)[2]]
+                                            if assignment != EMPTY else 0
+                                            for cell, assignment in enumerate(self.timetable.cells)])
+
+    def add_violated_constraint(self, professor: str, day: int, interval: int):
         """Adds a violated constraint to the dictionary"""
         self.violated_constraints[professor].append((day, interval))
-    
+
     def initialize_days(self):
         """Initializes the days of the schedule"""
-        for day in self.schedule_data.days:
-            for interval in self.schedule_data.intervals:
-                i = {}
-                i[interval] = {}
-            self.days[day] = i
-        
-        # initializing the intervals of the schedule and classrooms
-        for day in self.days:
-            for interval in self.schedule_data.intervals:
-                if interval not in self.days[day]:
-                    self.days[day][interval] = {}
-                for classroom in self.schedule_data.classrooms:
-                    if classroom not in self.days[day][interval]:
-                        self.days[day][interval][classroom] = None
-    
+        self.invalidate()
+        self.timetable = Timetable(self.schedule_data)
+        self.evaluator = ConstraintEvaluator(self.timetable)
+        self.reached_students = array('i', [0]) * len(self.timetable.cells)
+
     def initialize_all_data(self):
         """Initializes all the data of the schedule"""
         self.violated_constraints = {prof: [] for prof in self.schedule_data.professors}
         # initializing the days of the week
         self.initialize_days()
         self.students_left = {course: self.schedule_data.courses[course] for course in self.schedule_data.courses}
-        for prof in self.schedule_data.professors:
-            self.schedule_data.professors[prof].nr_teaching_intervals = 0
-            self.schedule_data.professors[prof].already_assigned = False
-        for classroom in self.schedule_data.classrooms:
-            self.schedule_data.classrooms[classroom].initialize_slot_reached_students(self.schedule_data)
-
-    def create_initial_state(self):
-        """Creates the initial state of the schedule randomly"""
-        
+
+    def create_initial_state(self, max_retries: int = 100):
+        """
+        Creates the initial state of the schedule randomly, restarting when a course can't be placed anymore;
+        falls back to the greedy constructor after max_retries dead ends
+        """
+        self.construction_retries = 0
+        while self.construction_retries <= max_retries:
+            if self.construct_randomly():
+                return True
+            self.construction_retries += 1
+        random_retries = self.construction_retries
+        found = self.create_greedy_state()
+        self.construction_retries += random_retries
+        return found
+
+    def construct_randomly(self):
+        """Assigns the students of every course to random slots, returns False at a dead end"""
         self.initialize_all_data()
-        
-        
+
         for course in self.students_left:
             # assigning students to courses
-            #print("Trying to assign students to course: ", course)
-            assigned = False
             while self.students_left[course] > 0:
-                # tryin
-                assigned = self.try_assign_students(course)
-                if not assigned:
+                students_left = self.students_left[course]
+                if not self.try_assign_students(course):
                     self.try_assign_left_students(course)
-                
-            #print("Assigned all students to course: ", course)
+                if self.students_left[course] == students_left:
+                    # no professor or classroom is left for the course
+                    return False
             # after assigning all courses and students, schedule must contain None values for the rest of the slots
-            
-        
-        # sorting the days and intervals
-        for day in self.days:
-            self.days[day] = dict(sorted(self.days[day].items()))
-        
-        if not self.is_valid():
-            self.create_initial_state()
-    
+
+        return self.is_valid()
+
+    def create_state(self, method: str = 'random'):
+        """Creates the initial state with one of the INITIAL_STATES constructors"""
+        if method == 'greedy':
+            if not self.create_greedy_state():
+                raise ValueError(f'No valid initial state found after {self.construction_retries} retries')
+        elif not self.create_initial_state():
+            raise ValueError(f'No valid initial state found after {self.construction_retries} retries')
+
+    def create_greedy_state(self, max_retries: int = 100):
+        """Creates a valid initial state placing the scarcest courses first, restarting iteratively on dead ends"""
+        self.construction_retries = 0
+        while self.construction_retries <= max_retries:
+            self.initialize_all_data()
+            if self.construct_greedily():
+                return True
+            self.construction_retries += 1
+        return False
+
+    def course_options(self, course: int):
+        """Returns the (cell, professor) pairs where the course can still be assigned without breaking hard constraints"""
+        timetable = self.timetable
+        slot_professors = self.evaluator.slot_professors
+        nr_professors = self.evaluator.nr_professors
+        professors = list(mask_ids(self.evaluator.available_professors(course)))
+        options = []
+        for slot in range(timetable.nr_days * timetable.nr_intervals):
+            free_professors = [professor for professor in professors
+                               if slot_professors[slot * nr_professors + professor] == 0]
+            if len(free_professors) == 0:
+                continue
+            for classroom in self.schedule_data.course_classrooms[course]:
+                cell = slot * timetable.nr_classrooms + classroom
+                if timetable.cells[cell] == EMPTY:
+                    options.extend((cell, professor) for professor in free_professors)
+        return options
+
+    def can_cover(self, course: int, options: list):
+        """Forward check: the free classrooms and professor hours left can still seat all the students of the course"""
+        data = self.schedule_data
+        students_left = self.students_left[data.course_names[course]]
+        cells = {cell for cell, _ in options}
+        capacities = sorted((data.capacities[cell % self.timetable.nr_classrooms] for cell in cells), reverse=True)
+        if sum(capacities) < students_left:
+            return False
+
+        # fewest intervals needed, filling the largest classrooms first
+        needed_intervals = 0
+        while students_left > 0:
+            students_left -= capacities[needed_intervals]
+            needed_intervals += 1
+        professor_hours = sum(MAX_PROFESSOR_HOURS - self.evaluator.professor_hours[professor]
+                              for professor in {professor for _, professor in options})
+        return professor_hours >= needed_intervals
+
+    def construct_greedily(self):
+        """Assigns courses by scarcity with forward checking, returns False at a dead end"""
+        data = self.schedule_data
+        while True:
+            uncovered = [course for course in range(len(data.course_names))
+                         if self.students_left[data.course_names[course]] > 0]
+            if len(uncovered) == 0:
+                return self.is_valid()
+
+            options = {course: self.course_options(course) for course in uncovered}
+            if not all(self.can_cover(course, options[course]) for course in uncovered):
+                return False
+
+            # the course with the fewest options left is assigned first
+            course = min(uncovered, key=lambda course: len(options[course]))
+            students_left = self.students_left[data.course_names[course]]
+
+            nr_classrooms = self.timetable.nr_classrooms
+
+            def option_cost(option):
+                cell, professor = option
+                capacity = data.capacities[cell % nr_classrooms]
+                # wasted seats first, then the preferences of the professor, then the largest classroom,
+                # then the professor with the most hours left, ties broken randomly
+                return (max(0, capacity - students_left), data.preference_penalties[professor][cell // nr_classrooms],
+                        -capacity, self.evaluator.professor_hours[professor], self.random.random())
+
+            # after dead ends, the choice is randomized among more of the best options
+            ranked = heapq.nsmallest(self.construction_retries + 1, options[course], key=option_cost)
+            cell, professor = self.random.choice(ranked)
+            day, interval, classroom = self.timetable.slot(cell)
+            self.assign_course(data.course_names[course], day, interval, classroom, data.professor_names[professor])
+
+    def available_professors(self, course: str):
+        """Returns the professors that can teach the course and didn't reach 7 intervals"""
+        data = self.schedule_data
+        return [data.professor_names[professor]
+                for professor in mask_ids(self.evaluator.available_professors(data.course_ids[course]))]
+
     def try_assign_left_students(self, course: str):
         """Assigns a course randomly to a classroom and interval"""
-        available_professors = list(professor for professor in self.schedule_data.professors.keys()\
-            if course in self.schedule_data.professors[professor].courses and\
-            not self.schedule_data.professors[professor].already_assigned)
-        
+        available_professors = self.available_professors(course)
+
         if len(available_professors) == 0:
-            self.create_initial_state()
-            return
-        
-        random_professor = random.choice(available_professors)
-        
-        
+            return False
+
+        random_professor = self.random.choice(available_professors)
+        data = self.schedule_data
+        course_id = data.course_ids[course]
+
         # first trying to assign the course to an empty slot
-        for day in self.days:
-                for interval in self.days[day]:
-                    for classroom in self.days[day][interval]:
-                        if self.days[day][interval][classroom] is None and course in self.schedule_data.classrooms[classroom].classes_allowed:
-                            self.assign_course(course, day, interval, classroom, random_professor)
-                            # print("Assigned randomly!!!!")
-                            return True
+        for day in range(self.timetable.nr_days):
+            for interval in range(self.timetable.nr_intervals):
+                for classroom in data.course_classrooms[course_id]:
+                    if self.timetable.cells[self.timetable.cell(day, interval, classroom)] == EMPTY:
+                        self.assign_course(course, day, interval, classroom, random_professor)
+                        return True
 
         # if no empty slots are available, trying to assign the course to a slot not reaching the capacity
-        for day in self.days:
-            for interval in self.days[day]:
-                for classroom in self.days[day][interval]:
-                    if self.days[day][interval][classroom] is not None and\
-                        self.schedule_data.classrooms[classroom].slot_reached_students[day][interval] < self.schedule_data.classrooms[classroom].capacity\
-                        and course in self.schedule_data.classrooms[classroom].classes_allowed:
-                        # assigning the rest of the students to the course not reaching the capacity
-                        empty_spots = self.schedule_data.classrooms[classroom].capacity - self.schedule_data.classrooms[classroom].slot_reached_students[day][interval]
-                        if empty_spots >= self.students_left[course]:
-                            self.schedule_data.classrooms[classroom].slot_reached_students[day][interval] += self.students_left[course]
-                            self.students_left[course] = 0
-                            return True
-                        else:
-                            self.schedule_data.classrooms[classroom].slot_reached_students[day][interval] += empty_spots
-                            self.students_left[course] -= empty_spots
-                            return False
-                        
-                            
-                        
-    
+        for cell, _, _ in self.timetable.assignments():
+            classroom = self.timetable.slot(cell)[2]
+            capacity = data.capacities[classroom]
+            if self.reached_students[cell] < capacity\
+                and data.course_allowed_in_classroom[course_id][classroom]:
+                # assigning the rest of the students to the course not reaching the capacity
+                self.invalidate()
+                empty_spots = capacity - self.reached_students[cell]
+                if empty_spots >= self.students_left[course]:
+                    self.reached_students[cell] += self.students_left[course]
+                    self.students_left[course] = 0
+                    return True
+                else:
+                    self.reached_students[cell] += empty_spots
+                    self.students_left[course] -= empty_spots
+                    return False
+
     def try_assign_students(self, course: str):
         """Assigns a course to a classroom and interval"""
         assigned = False
         max_attempts = 1000 # maximum number of attempts to assign a course
         attempt = 0
+        data = self.schedule_data
+        course_id = data.course_ids[course]
         while attempt < max_attempts and not assigned:
             # getting only the professors that can teach the course
-            available_professors = [professor for professor in self.schedule_data.professors
-                    if course in self.schedule_data.professors[professor].courses
-                    and not self.schedule_data.professors[professor].already_assigned]
+            available_professors = self.available_professors(course)
             if len(available_professors) == 0:
-                self.create_initial_state()
-                return
+                return False
 
-            professor = random.choice(available_professors)
-            day_preferences = [pref for pref in self.schedule_data.professors[professor].preferences if pref in self.schedule_data.days]
-            interval_preferences = [pref for pref in self.schedule_data.professors[professor].preferences if pref in self.schedule_data.intervals]
+            professor = self.random.choice(available_professors)
+            professor_id = data.professor_ids[professor]
+            day_preferences = data.preferred_days[professor_id]
+            interval_preferences = data.preferred_intervals[professor_id]
 
             if len(day_preferences) == 0:
-                days = random.choices(self.schedule_data.days)
+                days = self.random.choices(range(len(data.day_names)))
             else:
-                days = random.choices(day_preferences)
+                days = self.random.choices(day_preferences)
             if len(interval_preferences) == 0:
-                intervals = random.choices(self.schedule_data.intervals)
+                intervals = self.random.choices(range(len(data.interval_names)))
             else:
-                intervals = random.choices(interval_preferences)
-            
-            classrooms = [classroom for classroom in self.schedule_data.classrooms\
-                if course in self.schedule_data.classrooms[classroom].classes_allowed]
-            
-            classrooms = random.choices(classrooms)
-            
-            
+                intervals = self.random.choices(interval_preferences)
+
+            classrooms = self.random.choices(data.course_classrooms[course_id])
+
             # checking if the course can be assigned to the classroom
-            can_assign_course = False
-            reason = None
             for day in days:
                 for interval in intervals:
                     for classroom in classrooms:
-                        can_assign_course, reason = self.can_assign_course(course, day, interval, classroom)
-                        if can_assign_course and not Professor.already_teaching_in_interval(professor, self.days, day, interval):
+                        can_assign_course, _ = self.can_assign_course(course, day, interval, classroom)
+                        if can_assign_course and not self.timetable.professor_in_interval(professor_id, day, interval):
                             # assigning the course to the classroom and professor
                             self.assign_course(course, day, interval, classroom, professor)
                             assigned = True
-                            #print("Assigned course: ", course, " to classroom: ", classroom, " on day: ", day, " at interval: ", interval, " with professor: ", professor)
                             break
-                            
                     if assigned:
                         break
                 if assigned:
@@ -189,324 +300,270 @@ class Schedule:
 
             attempt += 1
         return assigned
-    
-        
-    def can_assign_course(self, course: str, day: str, interval: tuple, classroom: str):
+
+
+    def can_assign_course(self, course: str, day: int, interval: int, classroom: int):
         """Checks if a course and professor can be assigned to a classroom"""
+        cell = self.timetable.cell(day, interval, classroom)
         # checking if the classroom is full already
-        if day in self.schedule_data.classrooms[classroom].slot_reached_students:
-            if interval in self.schedule_data.classrooms[classroom].slot_reached_students[day]:
-                if self.schedule_data.classrooms[classroom].slot_reached_students[day][interval] == self.schedule_data.classrooms[classroom].capacity:
-                    return False, 'Classroom is full.'
-                
-        
+        if self.reached_students[cell] == self.schedule_data.capacities[classroom]:
+            return False, 'Classroom is full.'
+
         # checking if classroom is already assigned in this slot
-        if self.days[day][interval][classroom] is not None:
-            #print("Classroom already assigned in this slot: ", day, " ", interval, " ", classroom[0])
+        if self.timetable.get(cell) is not None:
             return False, 'Classroom already assigned in this slot.'
-        
-        
+
         # all hard constraints checked, returning True
         return True, None
-        
-    def assign_course(self, course: str, day: str, interval: tuple, classroom: str, professor: str):
+
+    def assign_course(self, course: str, day: int, interval: int, classroom: int, professor: str):
         """Assigns a course to a classroom, day, interval and professor"""
-        
+        data = self.schedule_data
+        self.invalidate()
+
         # assigin the course to the classroom
-        if day in self.days and interval in self.days[day]:
-            self.days[day][interval][classroom] = (professor, course)
-        elif day in self.days:
-            self.days[day][interval] = {classroom: (professor, course)}
-        else:
-            self.days[day] = {interval: {classroom: (professor, course)}}
-        
-        # updating the professor data and increasing number of teaching intervals
-        self.schedule_data.professors[professor].increment_nr_teaching_intervals()
-        
+        cell = self.timetable.cell(day, interval, classroom)
+        self.timetable.set(cell, data.professor_ids[professor], data.course_ids[course])
+        # updating the number of teaching intervals of the professor
+        self.evaluator.add(cell, self.timetable.cells[cell])
+
         # updating the number of students left to assign to the course and the number of students reached in the classroom
-        if self.students_left[course] > self.schedule_data.classrooms[classroom].capacity:
-            self.students_left[course] -= self.schedule_data.classrooms[classroom].capacity
-            self.schedule_data.classrooms[classroom].slot_reached_students[day][interval] = self.schedule_data.classrooms[classroom].capacity
+        capacity = data.capacities[classroom]
+        if self.students_left[course] > capacity:
+            self.students_left[course] -= capacity
+            self.reached_students[cell] = capacity
         else:
-            self.schedule_data.classrooms[classroom].slot_reached_students[day][interval] = self.students_left[course]
+            self.reached_students[cell] = self.students_left[course]
             self.students_left[course] = 0
-    
+
+    def unassign_course(self, cell: int):
+        """Removes the course assigned by assign_course from a cell, giving its students back to the course"""
+        assignment = self.timetable.cells[cell]
+        course = self.schedule_data.course_names[assignment % self.timetable.nr_courses]
+        self.invalidate()
+        self.evaluator.remove(cell, assignment)
+        self.timetable.clear(cell)
+        self.students_left[course] += self.reached_students[cell]
+        self.reached_students[cell] = 0
+
     def is_valid(self):
         """Checks if the current schedule is valid based on hard constraints"""
-        return check_mandatory_constraints(self.days, self.specs) == 0
-        
-    
+        return self.evaluator.hard_cost == 0
+
+
     def find_new_prof_to_reassign(self, professor: str, course: str):
         """Finds a random new professor available"""
-        new_professor = None
-        available_professors = [prof for prof in self.schedule_data.professors\
-            if course in self.schedule_data.professors[prof].courses\
-            and not self.schedule_data.professors[prof].already_assigned]
+        available_professors = self.available_professors(course)
 
         if len(available_professors) == 0:
             return False
-        
-        #print("AVAILABLE PROFESSORS: ", available_professors)
 
-        new_professor = random.choice(available_professors)
+        new_professor = self.random.choice(available_professors)
         return new_professor
-            
-    
+
+
     def get_random_violated_slot(self, professor: str,
                                  day_constraints_violated: list,
                                  interval_constraints_violated: list):
-        """Returns a random violated slot, classroom, and course for a professor based on the constraints."""
-        violated_day = None
-        violated_interval = None
+        """Returns a random violated cell and course for a professor based on the constraints."""
+        professor_id = self.schedule_data.professor_ids[professor]
 
         if len(day_constraints_violated) != 0:
-            violated_day = random.choice(day_constraints_violated)
-            for day in self.days:
-                if day == violated_day:
-                    for interval in self.days[day]:
-                        for classroom, data in self.days[day][interval].items():
-                            if data and data[0] == professor:
-                                return day, interval, classroom, data[1]
+            violated_day = self.random.choice(day_constraints_violated)
+            for cell, crt_professor, course in self.timetable.assignments():
+                if crt_professor == professor_id and self.timetable.slot(cell)[0] == violated_day:
+                    return cell, course
         elif len(interval_constraints_violated) != 0:
-            violated_interval = random.choice(interval_constraints_violated)
-            for day in self.days:
-                for interval in self.days[day]:
-                    if interval == violated_interval:
-                        for classroom, data in self.days[day][interval].items():
-                            if data and data[0] == professor:
-                                return day, interval, classroom, data[1]
-        
-        
-            
-    
+            violated_interval = self.random.choice(interval_constraints_violated)
+            for cell, crt_professor, course in self.timetable.assignments():
+                if crt_professor == professor_id and self.timetable.slot(cell)[1] == violated_interval:
+                    return cell, course
+        return None, None
+
     def generate_available_slots(self, day_constraints_violated: list,
                                   interval_constraints_violated: list):
         """Generates available day and interval for a professor based on the constraints."""
         slots = {}
-        for day in self.days:
-            for interval in self.days[day]:
+        for day in range(self.timetable.nr_days):
+            for interval in range(self.timetable.nr_intervals):
                 if day not in day_constraints_violated and interval not in interval_constraints_violated:
                     slots[(day, interval)] = True
         return slots
-    
-    def try_assign_left_students_empty_slots(self, course: str, left_students: int):
-        """Tries to assign the rest of the students to a course and returns False if couldnt assign all students"""
-        
-        for day in self.days:
-            for interval in self.days[day]:
-                # getting a random professor that can teach the course
-                available_professors = list(professor for professor in self.schedule_data.professors.keys()\
-                if course in self.schedule_data.professors[professor].courses and\
-                not self.schedule_data.professors[professor].already_assigned)
-
-                if len(available_professors) == 0:
-                    return False
-                random_professor = random.choice(available_professors)
-                
-                for classroom in self.days[day][interval]:
-                    
-                    if self.days[day][interval][classroom] is None and\
-                        course in self.schedule_data.classrooms[classroom].classes_allowed:
-                        # assigning the rest of the students to the course not reaching the capacity
-                        empty_spots = self.schedule_data.classrooms[classroom].capacity - self.schedule_data.classrooms[classroom].slot_reached_students[day][interval]
-                        if empty_spots >= left_students:
-                            self.days[day][interval][classroom] = (random_professor, course)
-                            self.schedule_data.professors[random_professor].increment_nr_teaching_intervals()
-                            self.schedule_data.classrooms[classroom].slot_reached_students[day][interval] += left_students
-                            left_students = 0
-                            return True
-                        else:
-                            self.days[day][interval][classroom] = (random_professor, course)
-                            self.schedule_data.professors[random_professor].increment_nr_teaching_intervals()
-                            self.schedule_data.classrooms[classroom].slot_reached_students[day][interval] += empty_spots
-                            left_students -= empty_spots
-                    if left_students == 0:
-                        return True
-        return False
 
-    def try_to_assign_left_students(self, course: str, number_of_students: int):
-        """Tries to assign the rest of the students to a course and returns False if couldnt assign all students"""
-        for day in self.days:
-            for interval in self.days[day]:
-                for classroom in self.days[day][interval]:
-                    if self.days[day][interval][classroom] is not None and course in self.schedule_data.classrooms[classroom].classes_allowed\
-                        and self.schedule_data.classrooms[classroom].slot_reached_students[day][interval] < self.schedule_data.classrooms[classroom].capacity:
-                        empty_spots = self.schedule_data.classrooms[classroom].capacity - self.schedule_data.classrooms[classroom].slot_reached_students[day][interval]
-                        if empty_spots >= number_of_students:
-                            self.schedule_data.classrooms[classroom].slot_reached_students[day][interval] += number_of_students
-                            number_of_students = 0
-                            return True
-                        else:
-                            self.schedule_data.classrooms[classroom].slot_reached_students[day][interval] += empty_spots
-                            number_of_students -= empty_spots
-        
-        return False
+    def find_move_for_professor(self, professor: str, available_slots: dict, course: int, old_cell: int):
+        """Finds a move taking the professor out of a violated cell into an available slot, or None."""
+        data = self.schedule_data
+        timetable = self.timetable
+        professor_id = data.professor_ids[professor]
+        old_day, old_interval, old_classroom = timetable.slot(old_cell)
+
+        # case when the classroom is the same
+        for (day, interval), available in available_slots.items():
+            cell = timetable.cell(day, interval, old_classroom)
+            if available and timetable.get(cell) is None\
+                and not timetable.professor_in_interval(professor_id, day, interval):
+                return Relocate(timetable, old_cell, cell)
+
+        # case when the classroom is different and has at least the capacity of the old classroom
+        for (day, interval), available in available_slots.items():
+            if not available or timetable.professor_in_interval(professor_id, day, interval):
+                continue
+            for cell in timetable.slot_cells(day, interval):
+                classroom = timetable.slot(cell)[2]
+                if timetable.get(cell) is None and classroom != old_classroom\
+                    and data.course_allowed_in_classroom[course][classroom]\
+                    and data.capacities[old_classroom] <= data.capacities[classroom]:
+                    return Relocate(timetable, old_cell, cell)
+
+        # case when professors are different, swapping with a professor teaching the same course
+        for (day, interval), available in available_slots.items():
+            if not available or timetable.professor_in_interval(professor_id, day, interval):
+                continue
+            for cell in timetable.slot_cells(day, interval):
+                assigned = timetable.get(cell)
+                if assigned and assigned[1] == course and assigned[0] != professor_id\
+                    and not timetable.professor_in_interval(assigned[0], old_day, old_interval):
+                    return Swap(timetable, old_cell, cell)
+
+        # case when another professor can take over the violated cell
+        available_professors = [prof for prof in mask_ids(self.evaluator.available_professors(course))
+                                if prof != professor_id
+                                and not timetable.professor_in_interval(prof, old_day, old_interval)]
+        if len(available_professors) != 0:
+            return Reassign(timetable, old_cell, self.random.choice(available_professors))
+
+        return None
 
-        
-    
-    def try_to_assign_professor(self, professor: str, available_slots: dict, course: str, old_day: str, old_interval: tuple, old_classroom: str):
-        """Tries to assign a professor to a new slot and returns left professor if no empty slots are available."""
-        assigned = False
-        for slot, available in available_slots.items():
-            if available:
-                for classroom in self.days[slot[0]][slot[1]]:
-                    if self.days[slot[0]][slot[1]][classroom] is None and old_classroom == classroom\
-                        and not Professor.already_teaching_in_interval(professor, self.days, slot[0], slot[1]):
-                        # case when the classroom is the same
-                        self.days[slot[0]][slot[1]][classroom] = (professor, course)
-                        self.days[old_day][old_interval][old_classroom] = None
-                        assigned = True
-                        break
-                if assigned:
-                    break
-            if assigned:
-                break
-        
-        for slot, available in available_slots.items():
-            if available:
-                for classroom in self.days[slot[0]][slot[1]]:    
-                    if self.days[slot[0]][slot[1]][classroom] is None and old_classroom != classroom\
-                        and classroom in self.schedule_data.classrooms[classroom].classes_allowed\
-                        and not Professor.already_teaching_in_interval(professor, self.days, slot[0], slot[1]):
-                        # case when the classroom is different
-                        
-                        # case when the classroom is not full and number of students from old classroom is less than the capacity
-                        if self.schedule_data.classrooms[old_classroom].slot_reached_students[slot[0]][slot[1]] <= self.schedule_data.classrooms[classroom].capacity:
-                            self.schedule_data.classrooms[classroom].slot_reached_students[slot[0]][slot[1]] = self.schedule_data.classrooms[old_classroom].slot_reached_students[old_day][old_interval]
-                            self.schedule_data.classrooms[old_classroom].slot_reached_students[old_day][old_interval] = 0
-                            self.days[slot[0]][slot[1]][classroom] = (professor, course)
-                            self.days[old_day][old_interval][old_classroom] = None
-                            assigned = True
-                            break
 
-                        # case when the classroom is not full and number of students from old classroom is greater than the capacity
-                        elif self.schedule_data.classrooms[old_classroom].slot_reached_students[old_day][old_interval] > self.schedule_data.classrooms[classroom].capacity:
-                            left_to_assign = self.schedule_data.classrooms[old_classroom].slot_reached_students[old_day][old_interval] - self.schedule_data.classrooms[classroom].capacity
-                            self.schedule_data.classrooms[classroom].slot_reached_students[slot[0]][slot[1]] = self.schedule_data.classrooms[classroom].capacity
-                            self.days[slot[0]][slot[1]][classroom] = (professor, course)
-                            assigned, left_students = self.try_to_assign_left_students(course, left_to_assign)
-                            if left_students:
-                                assigned = self.try_assign_left_students_empty_slots(course) 
-                            else:
-                                assigned = True  
-                if assigned:
-                    break
-            if assigned:
-                break
-            
-        # case when professors are different
-        for slot, available in available_slots.items():
-            if available:
-                for classroom in self.days[slot[0]][slot[1]]:
-                    if self.days[slot[0]][slot[1]][classroom] and self.days[slot[0]][slot[1]][classroom][1] == course\
-                        and self.days[slot[0]][slot[1]][classroom][0] != professor and\
-                        not Professor.already_teaching_in_interval(professor, self.days, slot[0], slot[1]):
-
-                        old_professor = self.days[slot[0]][slot[1]][classroom][0]
-                        self.days[old_day][old_interval][old_classroom] = None
-                        self.days[slot[0]][slot[1]][classroom] = (professor, course)
-                        self.schedule_data.professors[old_professor].decrement_nr_teaching_intervals()
-                        assigned = True
-            if assigned:
-                break
-        
-        return assigned
-        
-    
     def resolve_violated_constraints(self, professor: str, violated_constraints: list):
-        """Resolves the violated constraints for a professor"""
+        """Returns a move resolving one of the violated constraints of a professor, or None"""
         day_constraints_violated = [vc[0] for vc in violated_constraints if vc[0] is not None]
         interval_constraints_violated = [vc[1] for vc in violated_constraints if vc[1] is not None]
-        
-        
-        violated_day, violated_interval, old_classroom, course_to_reassign =\
+
+
+        violated_cell, course_to_reassign =\
             self.get_random_violated_slot(professor, day_constraints_violated, interval_constraints_violated)
-        
+        if violated_cell is None:
+            return None
+
         # generating a new day and interval for the professor which suit the preferences and a violated slot to replace
         available_slots = self.generate_available_slots(day_constraints_violated,\
             interval_constraints_violated)
 
         if len(available_slots) == 0:
-            return False
-        
-        assigned = self.try_to_assign_professor(professor, available_slots, course_to_reassign, violated_day, violated_interval, old_classroom)
-        return assigned
-        
-    
-    def successors(self):
-        """Generates the successors of the current state"""
-        successors = []
+            return None
+
+        return self.find_move_for_professor(professor, available_slots, course_to_reassign, violated_cell)
+
+    def find_violated_constraints(self):
+        """Rebuilds the violated constraints of every professor from the timetable, if it changed since the last call"""
+        if not self.violated_constraints_stale:
+            return
+        self.violated_constraints_stale = False
+        data = self.schedule_data
+        self.violated_constraints = {prof: [] for prof in data.professors}
+        for cell, professor_id, _ in self.timetable.assignments():
+            if self.evaluator.professor_violations[professor_id] == 0:
+                continue
+            day, interval, _ = self.timetable.slot(cell)
+            professor = data.professor_names[professor_id]
+            if data.day_penalties[professor_id][day]:
+                self.add_violated_constraint(professor, day, None)
+            if data.interval_penalties[professor_id][interval]:
+                self.add_violated_constraint(professor, None, interval)
+
+    def successor_moves(self):
+        """Generates the moves leading to the successors of the current state, without copying it"""
+        self.find_violated_constraints()
+        moves = []
         for professor in self.violated_constraints:
             # getting the violated constraints for each professor
             violated_constraints = self.violated_constraints[professor]
             if len(violated_constraints) == 0:
                 continue
-            new_schedule = copy.deepcopy(self)
-            new_schedule.violated_constraints = {prof: [] for prof in new_schedule.schedule_data.professors}
-            resolved = new_schedule.resolve_violated_constraints(professor, violated_constraints)
-            if resolved and new_schedule.is_valid():
-                successors.append(new_schedule)
-
-        return successors
-    
-        
-    
+            move = self.resolve_violated_constraints(professor, violated_constraints)
+            if move is not None:
+                moves.append(move)
+        return moves
+
+    def apply_move(self, move: Move):
+        """Applies a move in place"""
+        self.invalidate()
+        move.apply(self.timetable)
+        move.carry(self.reached_students)
+        self.evaluator.apply(move)
+
+    def undo_move(self, move: Move):
+        """Reverts a move applied in place"""
+        self.invalidate()
+        move.undo(self.timetable)
+        move.uncarry(self.reached_students)
+        self.evaluator.undo(move)
+
+    def copy(self):
+        """Returns a copy of the state sharing the schedule data"""
+        # built without __init__, which would allocate a timetable and an evaluator only to replace them
+        new_schedule = Schedule.__new__(Schedule)
+        new_schedule.random = self.random
+        new_schedule.specs = self.specs
+        new_schedule.schedule_data = self.schedule_data
+        new_schedule.timetable = self.timetable.copy()
+        new_schedule.evaluator = self.evaluator.copy()
+        new_schedule.reached_students = array('i', self.reached_students)
+        new_schedule.students_left = dict(self.students_left)
+        new_schedule.construction_retries = self.construction_retries
+        # the violated constraints are rebuilt into a new dictionary, so the copy can share them until then
+        new_schedule.violated_constraints = self.violated_constraints
+        new_schedule.violated_constraints_stale = self.violated_constraints_stale
+        new_schedule.cached_heuristic = self.cached_heuristic
+        return new_schedule
+
+    def materialize(self, move: Move):
+        """Returns the successor state obtained by applying a move to a copy of the current state"""
+        new_schedule = self.copy()
+        new_schedule.apply_move(move)
+        return new_schedule
+
     def heuristic(self):
-        """Estimate of the cost to reach a goal state from the current state."""
-        cost = 0
-        # Evaluate the number of violated preferences for each professor
-        for professor in self.schedule_data.professors:
-            preferences = self.schedule_data.professors[professor].preferences
-            for day in self.days:
-                for interval in self.days[day]:
-                    for classroom, assigned in self.days[day][interval].items():
-                        if assigned and assigned[0] == professor:
-                            # Check if the day is a preferred day
-                            if day not in preferences:
-                                self.add_violated_constraint(professor, day, None)
-                                cost += 1
-                            # Check if the interval is a preferred interval
-                            if interval not in preferences:
-                                self.add_violated_constraint(professor, None, interval)
-                                cost += 1
-                            # Additional cost for each student that could not be accommodated in their preferred slot
-                            remaining_students = self.students_left.get(assigned[1], 0)
-                            if remaining_students > 0:
-                                cost += remaining_students
+        """Estimate of the cost to reach a goal state from the current state, computed once per state."""
+        if self.cached_heuristic is not None:
+            return self.cached_heuristic
+        # number of violated preferences of all professors
+        cost = self.evaluator.soft_cost
+        # additional cost for each student that could not be accommodated, for every slot of the course
+        for course, remaining_students in self.students_left.items():
+            if remaining_students > 0:
+                cost += remaining_students * self.evaluator.course_assignments[self.schedule_data.course_ids[course]]
+        self.cached_heuristic = cost
         return cost
-    
+
     def is_goal(self):
         """Checks if state is goal state"""
-        return check_mandatory_constraints(self.days, self.specs) == 0 and check_optional_constraints(self.days, self.specs) == 0
-    
-   
-    def transition_cost(self, successor):
+        # the soft cost of the evaluator counts the same violations as check_optional_constraints
+        return self.is_valid() and self.evaluator.soft_cost == 0
+
+
+    def move_transition_cost(self, move: Move):
         """
-        Computes the cost of transitioning from the current state to a successor state.
-        The cost is based on changes to the assignment of professors to courses and classrooms, 
-        as well as maintaining alignment with professor preferences.
+        Computes the cost of applying a move from the cells it writes: a penalty for every changed cell,
+        plus a penalty for every new assignment breaking the preferences of its professor
         """
         cost = 0
-        change_penalty = 10 
-
-        for day in self.days:
-            for interval in self.days[day]:
-                for classroom in self.days[day][interval]:
-                    current_assignment = self.days[day][interval].get(classroom)
-                    successor_assignment = successor.days[day][interval].get(classroom)
+        change_penalty = 10
 
-                    if current_assignment != successor_assignment:
-                        cost += change_penalty
+        for cell, old, new in move.writes:
+            if old != new:
+                cost += change_penalty
 
-                        if successor_assignment:
-                            professor, course = successor_assignment
-                            if not self.meets_professor_preferences(professor, day, interval):
-                                cost += 5 
+                if new != EMPTY:
+                    day, interval, _ = self.timetable.slot(cell)
+                    if not self.meets_professor_preferences(new // self.timetable.nr_courses, day, interval):
+                        cost += 5
 
         return cost
 
-    def meets_professor_preferences(self, professor, day, interval):
+    def meets_professor_preferences(self, professor: int, day: int, interval: int):
         """Determine if a given time slot meets the specified professor's preferences."""
-        # Assuming preferences are stored in a dictionary format or similar
-        preferences = self.schedule_data.professors[professor].preferences
-        return (day, interval) in preferences
\ No newline at end of file
+        # both the day and the interval have to be preferred, same as the soft cost
+        slot = day * self.timetable.nr_intervals + interval
+        return self.schedule_data.preference_penalties[professor][slot] == 0
@@ -1,3 +1,18 @@
+import random
+from array import array
+
+
+def mask_ids(mask: int):
+    """Yields the ids set in a bitset, in increasing order"""
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+ZOBRIST_SEED = 0x5eed # fixed, so every process gives the same hash to the same timetable
+
+
 class ScheduleData:
     """ScheduleData class"""
     def __init__(self, professors: dict, classrooms: dict, courses: dict, intervals: list, days: list, specs: dict):
@@ -6,4 +21,106 @@ class ScheduleData:
         self.courses = courses
         self.intervals = intervals
         self.days = days
-        self.specs = specs
\ No newline at end of file
+        self.specs = specs
+        self.build_id_tables()
+        self.build_eligibility()
+        self.build_preference_penalties()
+        self.build_gap_penalties()
+        self.build_zobrist_keys()
+
+    def build_id_tables(self):
+        """Interns professors, courses, classrooms, days and intervals into integer ids used by the compact timetable"""
+        self.professor_names = list(self.professors)
+        self.course_names = list(self.courses)
+        self.classroom_names = list(self.classrooms)
+        self.day_names = list(self.days)
+        # intervals are kept sorted, same as the legacy days dictionary
+        self.interval_names = sorted(self.intervals)
+
+        self.professor_ids = {name: idx for idx, name in enumerate(self.professor_names)}
+        self.course_ids = {name: idx for idx, name in enumerate(self.course_names)}
+        self.classroom_ids = {name: idx for idx, name in enumerate(self.classroom_names)}
+        self.day_ids = {name: idx for idx, name in enumerate(self.day_names)}
+        self.interval_ids = {interval: idx for idx, interval in enumerate(self.interval_names)}
+
+        # tables used by the hard constraints checks, indexed by ids
+        self.capacities = [self.classrooms[classroom].capacity for classroom in self.classroom_names]
+        self.course_allowed_in_classroom = [[course in self.classrooms[classroom].classes_allowed
+                                             for classroom in self.classroom_names]
+                                            for course in self.course_names]
+        self.professor_teaches_course = [[course in self.professors[professor].courses
+                                          for course in self.course_names]
+                                         for professor in self.professor_names]
+
+    def build_eligibility(self):
+        """Builds the indexes of the professors and classrooms eligible for every course and of the preferences"""
+        self.course_professors_mask = [sum(1 << professor for professor in range(len(self.professor_names))
+                                           if self.professor_teaches_course[professor][course])
+                                       for course in range(len(self.course_names))]
+        self.course_classrooms_mask = [sum(1 << classroom for classroom in range(len(self.classroom_names))
+                                           if self.course_allowed_in_classroom[course][classroom])
+                                       for course in range(len(self.course_names))]
+        self.course_classrooms = [list(mask_ids(mask)) for mask in self.course_classrooms_mask]
+        # bitsets of the preferred day and interval ids and break thresholds of every professor, the only place
+        # reading the preferences of the input, every other preference table is built from them
+        self.preferred_days_mask = [sum(1 << self.day_ids[preference]
+                                        for preference in set(self.professors[professor].preferences)
+                                        if preference in self.day_ids)
+                                    for professor in self.professor_names]
+        self.preferred_intervals_mask = [sum(1 << self.interval_ids[preference]
+                                             for preference in set(self.professors[professor].preferences)
+                                             if preference in self.interval_ids)
+                                         for professor in self.professor_names]
+        # longest breaks in hours accepted by every professor between two intervals of a day, one per
+        # '!Pauza > N' constraint, each counted separately like in the checker
+        self.gap_thresholds = [[int(preference.split('>')[1])
+                                for preference in self.professors[professor].preferences
+                                if isinstance(preference, str) and preference.startswith('!Pauza')]
+                               for professor in self.professor_names]
+        # preferred day and interval ids of every professor, in increasing order
+        self.preferred_days = [list(mask_ids(mask)) for mask in self.preferred_days_mask]
+        self.preferred_intervals = [list(mask_ids(mask)) for mask in self.preferred_intervals_mask]
+
+    def build_preference_penalties(self):
+        """Builds the tables of violated preferences indexed by professor, day and interval ids"""
+        # 1 if the professor doesn't prefer the day / interval, same as the hill climbing cost
+        self.day_penalties = [[int(not mask >> day & 1) for day in range(len(self.day_names))]
+                              for mask in self.preferred_days_mask]
+        self.interval_penalties = [[int(not mask >> interval & 1) for interval in range(len(self.interval_names))]
+                                   for mask in self.preferred_intervals_mask]
+        # penalty of a professor teaching in a slot, indexed by [professor][day * nr intervals + interval]
+        self.preference_penalties = [[day_penalty + interval_penalty
+                                      for day_penalty in self.day_penalties[professor]
+                                      for interval_penalty in self.interval_penalties[professor]]
+                                     for professor in range(len(self.professor_names))]
+
+    def build_gap_penalties(self):
+        """Builds the tables of the violated '!Pauza > N' constraints indexed by the day occupancy bitset"""
+        # number of breaks longer than the thresholds of a professor in a day, summed over its constraints,
+        # indexed by the bitset of the intervals taught that day; None for professors without constraint
+        tables = {}
+        for thresholds in self.gap_thresholds:
+            key = tuple(sorted(thresholds))
+            if len(key) > 0 and key not in tables:
+                tables[key] = array('i', (sum(self.count_gaps(mask, threshold) for threshold in key)
+                                          for mask in range(1 << len(self.interval_names))))
+        self.gap_penalties = [tables[tuple(sorted(thresholds))] if len(thresholds) > 0 else None
+                              for thresholds in self.gap_thresholds]
+
+    def count_gaps(self, mask: int, threshold: int):
+        """Returns the number of breaks longer than threshold hours between the consecutive intervals of a bitset"""
+        gaps = 0
+        previous = None
+        for interval in mask_ids(mask):
+            if previous is not None and self.interval_names[interval][0] - self.interval_names[previous][1] > threshold:
+                gaps += 1
+            previous = interval
+        return gaps
+
+    def build_zobrist_keys(self):
+        """Builds the random 64 bit keys of every (cell, assignment id) pair, xor-ed into the timetable hashes"""
+        rng = random.Random(ZOBRIST_SEED)
+        nr_cells = len(self.day_names) * len(self.interval_names) * len(self.classroom_names)
+        nr_assignments = len(self.professor_names) * len(self.course_names)
+        # indexed by [cell * nr assignments + assignment id]
+        self.zobrist_keys = array('Q', (rng.getrandbits(64) for _ in range(nr_cells * nr_assignments)))
@@ -0,0 +1,18 @@
+class SearchStats:
+    """Counters of the work done by a search algorithm"""
+    def __init__(self):
+        self.states_expanded = 0 # states whose successors were generated
+        self.successors_generated = 0 # moves generated from the expanded states
+        self.states_materialized = 0 # successors copied into a new Schedule
+        self.construction_retries = 0 # dead ends restarted while building initial states
+
+    def add(self, other: 'SearchStats'):
+        """Adds the counters of another search, e.g. of a worker process"""
+        self.states_expanded += other.states_expanded
+        self.successors_generated += other.successors_generated
+        self.states_materialized += other.states_materialized
+        self.construction_retries += other.construction_retries
+
+    def as_dict(self):
+        """Returns the counters as a dictionary"""
+        return dict(self.__dict__)
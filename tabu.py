@@ -0,0 +1,94 @@
+from schedule import Schedule
+from timetable import EMPTY
+from moves import Move
+from stats import SearchStats
+from progress import Progress
+from budget import Budget
+from neighbourhoods import NeighbourhoodSearch, RANDOM_MOVE_NEIGHBOURHOODS
+
+
+class TabuSearch:
+    """
+    Tabu search over the hill climbing successors and random moves: every step applies the best allowed move,
+    even a worse one, and forbids the professors to come back for a while to the slots they left
+    """
+
+    @staticmethod
+    def attributes(state: Schedule, move: Move):
+        """Returns the (professor, slot) pairs a move places and the ones it removes"""
+        nr_courses = state.timetable.nr_courses
+        nr_classrooms = state.timetable.nr_classrooms
+        entering = {(new // nr_courses, cell // nr_classrooms) for cell, _, new in move.writes if new != EMPTY}
+        leaving = {(old // nr_courses, cell // nr_classrooms) for cell, old, _ in move.writes if old != EMPTY}
+        return entering - leaving, leaving - entering
+
+    @staticmethod
+    def algorithm(initial_state: Schedule, stats: SearchStats = None, progress: Progress = None,
+                  max_iterations: int = 20000, budget: Budget = None, tenure: int = 10, samples: int = 50,
+                  diversification: float = 0.1, neighbourhoods: list = None):
+        """
+        Returns the best state found, its cost and the number of iterations.
+        A (professor, slot) left by a move is tabu for tenure (plus a random part) iterations, unless entering it
+        gives a new best cost (aspiration). Moves which don't improve the current cost are penalized by how often
+        they were made before, weighted by diversification, to lead the search to new parts of the timetable.
+        """
+        stats = stats if stats is not None else SearchStats()
+        progress = progress if progress is not None else Progress()
+        random_moves = NeighbourhoodSearch(neighbourhoods or RANDOM_MOVE_NEIGHBOURHOODS)
+
+        state = initial_state
+        rng = state.random
+        best_state = state.copy()
+        best_cost = state.evaluator.soft_cost
+        progress.improved(best_state, best_cost)
+
+        tabu_until = {} # (professor, slot) -> iteration until which the professor can't enter the slot again
+        frequency = {} # (professor, slot) -> number of moves which placed the professor in the slot
+        iters = 0
+        while iters < max_iterations and best_cost > 0:
+            if budget is not None and budget.exhausted(stats):
+                break
+            iters += 1
+
+            moves = state.successor_moves()
+            moves.extend(move for move in (random_moves.random_move(state) for _ in range(samples)) if move is not None)
+            stats.states_expanded += 1
+            stats.successors_generated += len(moves)
+            progress.expanded(state, iters, best_cost)
+
+            current_cost = state.evaluator.soft_cost
+            chosen_move = None
+            chosen_score = None
+            for move in moves:
+                hard_delta, soft_delta = state.evaluator.delta(move)
+                if hard_delta > 0:
+                    continue
+                cost = current_cost + soft_delta
+                entering, _ = TabuSearch.attributes(state, move)
+                tabu = any(tabu_until.get(attribute, 0) > iters for attribute in entering)
+                # aspiration: a tabu move is allowed when it beats the best state
+                if tabu and cost >= best_cost:
+                    continue
+                score = cost
+                if cost >= current_cost:
+                    score += diversification * sum(frequency.get(attribute, 0) for attribute in entering)
+                if chosen_score is None or score < chosen_score:
+                    chosen_move = move
+                    chosen_score = score
+            if chosen_move is None:
+                continue
+
+            entering, leaving = TabuSearch.attributes(state, chosen_move)
+            for attribute in leaving:
+                tabu_until[attribute] = iters + tenure + rng.randrange(tenure // 2 + 1)
+            for attribute in entering:
+                frequency[attribute] = frequency.get(attribute, 0) + 1
+            state.apply_move(chosen_move)
+
+            if state.evaluator.soft_cost < best_cost:
+                best_cost = state.evaluator.soft_cost
+                best_state = state.copy()
+                stats.states_materialized += 1
+                progress.improved(best_state, best_cost)
+
+        return best_state, best_cost, iters
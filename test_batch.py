@@ -0,0 +1,40 @@
+import os
+import unittest
+from neighbourhoods import NEIGHBOURHOODS
+from check_constraints import check_mandatory_constraints, check_optional_constraints
+from batch import BatchScorer, np
+from test_evaluator import INPUT_FILES, random_walk
+from orar import compile_input_file
+
+
+class TestBatchScorer(unittest.TestCase):
+    """The scores of stacked timetables against the full scan checkers"""
+
+    @unittest.skipIf(np is None, 'numpy is not installed')
+    def test_batch_scorer(self):
+        for input_file in INPUT_FILES:
+            schedule_data = compile_input_file(input_file)
+            scorer = BatchScorer(schedule_data)
+            states = [state.copy() for state in random_walk(schedule_data, 3)]
+            hard, soft = scorer.score_states(states)
+            for index, state in enumerate(states):
+                with self.subTest(input_file=os.path.basename(input_file), state=index):
+                    self.assertEqual(hard[index], check_mandatory_constraints(state.timetable, schedule_data.specs))
+                    self.assertEqual(soft[index], check_optional_constraints(state.timetable, schedule_data.specs))
+
+            # the successors scored without being materialized
+            state = states[-1]
+            neighbourhood = NEIGHBOURHOODS['relocate']()
+            moves = [move for move in (neighbourhood.random_move(state) for _ in range(20)) if move is not None]
+            if len(moves) == 0:
+                continue
+            hard, soft = scorer.score_moves(state, moves)
+            for index, move in enumerate(moves):
+                successor = state.materialize(move)
+                with self.subTest(input_file=os.path.basename(input_file), move=index):
+                    self.assertEqual(hard[index], check_mandatory_constraints(successor.timetable, schedule_data.specs))
+                    self.assertEqual(soft[index], check_optional_constraints(successor.timetable, schedule_data.specs))
+
+
+if __name__ == '__main__':
+    unittest.main()
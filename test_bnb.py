@@ -0,0 +1,26 @@
+import unittest
+from bnb import BranchAndBound
+from check_constraints import check_mandatory_constraints
+from test_evaluator import compile_specs
+from test_csp import INPUT_FILE, infeasible_specs
+from orar import compile_input_file
+
+
+class TestBranchAndBound(unittest.TestCase):
+    """The branch and bound search on a small input and on an infeasible one"""
+
+    def test_valid_schedule(self):
+        schedule_data = compile_input_file(INPUT_FILE)
+        state, cost, lower_bound, _ = BranchAndBound.algorithm(schedule_data, max_nodes=2000)
+        self.assertIsNotNone(state)
+        self.assertEqual(check_mandatory_constraints(state.timetable, schedule_data.specs), 0)
+        self.assertLessEqual(lower_bound, cost)
+
+    def test_infeasible(self):
+        state, cost, _, _ = BranchAndBound.algorithm(compile_specs(infeasible_specs()))
+        self.assertIsNone(state)
+        self.assertIsNone(cost)
+
+
+if __name__ == '__main__':
+    unittest.main()
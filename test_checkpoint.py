@@ -0,0 +1,68 @@
+import os
+import random
+import tempfile
+import unittest
+from checkpoint import Checkpoint, load_checkpoint
+from budget import Budget
+from sa import SimulatedAnnealing
+from manifest import file_hash
+from test_evaluator import INPUT_FILES, random_walk
+from orar import compile_input_file
+
+
+class TestCheckpoint(unittest.TestCase):
+    """Saving the best state of a search and resuming from it"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'checkpoint.pickle')
+        self.input_file = INPUT_FILES[0]
+        self.input_hash = file_hash(self.input_file)
+        self.schedule_data = compile_input_file(self.input_file)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_save_and_load(self):
+        state = next(random_walk(self.schedule_data, 7))
+        checkpoint = Checkpoint(self.path, self.input_hash, 'hc', period=0)
+        checkpoint.improved(state, state.evaluator.soft_cost)
+        resumed, cost = load_checkpoint(self.path, self.schedule_data, self.input_hash)
+        self.assertEqual(cost, state.evaluator.soft_cost)
+        self.assertEqual(resumed.timetable, state.timetable)
+        self.assertEqual(resumed.reached_students, state.reached_students)
+        self.assertTrue(resumed.evaluator.verify(resumed.timetable))
+        self.assertEqual(resumed.evaluator.soft_cost, cost)
+
+    def test_period_and_flush(self):
+        state = next(random_walk(self.schedule_data, 8))
+        checkpoint = Checkpoint(self.path, self.input_hash, 'hc', period=3600)
+        checkpoint.improved(state, state.evaluator.soft_cost)
+        # nothing is written before the period elapses, flush writes the pending state
+        self.assertFalse(os.path.exists(self.path))
+        checkpoint.flush()
+        self.assertTrue(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+    def test_other_input_is_rejected(self):
+        state = next(random_walk(self.schedule_data, 9))
+        checkpoint = Checkpoint(self.path, self.input_hash, 'hc', period=0)
+        checkpoint.improved(state, state.evaluator.soft_cost)
+        with self.assertRaises(ValueError):
+            load_checkpoint(self.path, self.schedule_data, file_hash(INPUT_FILES[1]))
+
+    def test_resume_search(self):
+        # a search saving its best states, then a second search resumed from the checkpoint
+        state = next(random_walk(self.schedule_data, 10))
+        checkpoint = Checkpoint(self.path, self.input_hash, 'sa', period=0)
+        _, best_cost, _ = SimulatedAnnealing.algorithm(state, progress=checkpoint, budget=Budget(max_evals=2000))
+        checkpoint.flush()
+        resumed, cost = load_checkpoint(self.path, self.schedule_data, self.input_hash, random.Random(1))
+        self.assertEqual(cost, best_cost)
+        self.assertEqual(resumed.evaluator.hard_cost, 0)
+        _, resumed_cost, _ = SimulatedAnnealing.algorithm(resumed, budget=Budget(max_evals=2000))
+        self.assertLessEqual(resumed_cost, cost)
+
+
+if __name__ == '__main__':
+    unittest.main()
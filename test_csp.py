@@ -0,0 +1,36 @@
+import os
+import unittest
+import yaml
+from csp import CSP
+from check_constraints import check_mandatory_constraints
+from test_evaluator import INPUT_FILES, compile_specs
+from orar import compile_input_file
+
+INPUT_FILE = [input_file for input_file in INPUT_FILES if os.path.basename(input_file) == 'orar_mic_exact.yaml'][0]
+
+
+def infeasible_specs():
+    """Returns the dummy input with more students of a course than its classrooms can ever seat"""
+    dummy = [input_file for input_file in INPUT_FILES if os.path.basename(input_file) == 'dummy.yaml'][0]
+    with open(dummy) as file:
+        specs = yaml.safe_load(file)
+    specs['Materii']['MS'] = 10000
+    return specs
+
+
+class TestCSP(unittest.TestCase):
+    """The CSP backtracking search on a small input and on an infeasible one"""
+
+    def test_valid_schedule(self):
+        schedule_data = compile_input_file(INPUT_FILE)
+        state, _ = CSP.algorithm(schedule_data)
+        self.assertIsNotNone(state)
+        self.assertEqual(check_mandatory_constraints(state.timetable, schedule_data.specs), 0)
+
+    def test_infeasible(self):
+        state, _ = CSP.algorithm(compile_specs(infeasible_specs()))
+        self.assertIsNone(state)
+
+
+if __name__ == '__main__':
+    unittest.main()
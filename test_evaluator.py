@@ -0,0 +1,57 @@
+import glob
+import os
+import random
+import tempfile
+import unittest
+import yaml
+from orar import compile_input_file
+from schedule import Schedule
+from neighbourhoods import NEIGHBOURHOODS
+
+INPUT_FILES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'inputs', '*.yaml')))
+STEPS = 60 # random moves applied to every input
+
+
+def random_walk(schedule_data, seed: int, steps: int = STEPS):
+    """
+    Yields the state after every random move of every neighbourhood, moves breaking hard constraints included;
+    one move in four is undone right after being applied
+    """
+    rng = random.Random(seed)
+    state = Schedule(schedule_data, random.Random(seed))
+    state.create_state('greedy')
+    yield state
+    neighbourhoods = [neighbourhood() for neighbourhood in NEIGHBOURHOODS.values()]
+    for _ in range(steps):
+        move = rng.choice(neighbourhoods).random_move(state)
+        if move is None:
+            continue
+        state.apply_move(move)
+        yield state
+        if rng.random() < 0.25:
+            state.undo_move(move)
+            yield state
+
+
+def compile_specs(specs: dict):
+    """Returns the ScheduleData of an input given as a dictionary"""
+    with tempfile.TemporaryDirectory() as directory:
+        input_file = os.path.join(directory, 'input.yaml')
+        with open(input_file, 'w') as file:
+            yaml.safe_dump(specs, file)
+        return compile_input_file(input_file)
+
+
+class TestEvaluator(unittest.TestCase):
+    """The incremental evaluator against the full scan checkers"""
+
+    def test_verify_after_moves_and_undos(self):
+        for input_file in INPUT_FILES:
+            schedule_data = compile_input_file(input_file)
+            for step, state in enumerate(random_walk(schedule_data, 1)):
+                with self.subTest(input_file=os.path.basename(input_file), step=step):
+                    self.assertTrue(state.evaluator.verify(state.timetable))
+
+
+if __name__ == '__main__':
+    unittest.main()
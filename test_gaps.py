@@ -0,0 +1,67 @@
+import copy
+import os
+import unittest
+from timetable import EMPTY
+from schedule import Schedule
+from check_constraints import check_optional_constraints
+from test_evaluator import INPUT_FILES, random_walk, compile_specs
+from orar import compile_input_file
+
+
+def gap_specs(specs: dict):
+    """Returns a copy of the input keeping only the '!Pauza > N' constraints of the professors"""
+    specs = copy.deepcopy(specs)
+    for professor in specs['Profesori'].values():
+        professor['Constrangeri'] = [constraint for constraint in professor['Constrangeri'] if 'Pauza' in constraint]
+    return specs
+
+
+class TestGaps(unittest.TestCase):
+    """The day bitsets and the gap tables of the '!Pauza > N' constraints against the checker"""
+
+    def test_gap_bitsets(self):
+        for input_file in INPUT_FILES:
+            schedule_data = compile_input_file(input_file)
+            specs = gap_specs(schedule_data.specs)
+            nr_professors = len(schedule_data.professor_names)
+            for step, state in enumerate(random_walk(schedule_data, 2)):
+                with self.subTest(input_file=os.path.basename(input_file), step=step):
+                    evaluator = state.evaluator
+                    self.assertEqual(evaluator.gap_cost, check_optional_constraints(state.timetable, specs))
+                    # the day bitsets hold the intervals taught by every professor
+                    for cell, assignment in enumerate(state.timetable.cells):
+                        if assignment != EMPTY:
+                            day, interval, _ = state.timetable.slot(cell)
+                            professor = assignment // state.timetable.nr_courses
+                            self.assertTrue(evaluator.professor_days[day * nr_professors + professor] >> interval & 1)
+                    # and the tables indexed by them count the violated breaks
+                    gaps = sum(schedule_data.gap_penalties[professor][evaluator.professor_days[
+                                   day * nr_professors + professor]]
+                               for day in range(len(schedule_data.day_names))
+                               for professor in range(nr_professors)
+                               if schedule_data.gap_penalties[professor] is not None)
+                    self.assertEqual(gaps, evaluator.gap_cost)
+
+    def test_every_break_constraint_is_counted(self):
+        # a professor with two '!Pauza' constraints, both broken by the 4 hour break between 8-10 and 14-16
+        specs = {
+            'Intervale': ['(8, 10)', '(10, 12)', '(12, 14)', '(14, 16)'],
+            'Materii': {'PA': 20},
+            'Profesori': {'Ana Pop': {'Constrangeri': ['Luni', '8-16', '!Pauza > 0', '!Pauza > 2'],
+                                      'Materii': ['PA']}},
+            'Sali': {'EG1': {'Capacitate': 10, 'Materii': ['PA']}},
+            'Zile': ['Luni'],
+        }
+        schedule_data = compile_specs(specs)
+        self.assertEqual(sorted(schedule_data.gap_thresholds[0]), [0, 2])
+        state = Schedule(schedule_data)
+        state.initialize_all_data()
+        state.assign_course('PA', 0, 0, 0, 'Ana Pop')
+        state.assign_course('PA', 0, 3, 0, 'Ana Pop')
+        self.assertEqual(state.evaluator.gap_cost, 2)
+        self.assertEqual(state.evaluator.soft_cost, check_optional_constraints(state.timetable, specs))
+        self.assertTrue(state.evaluator.verify(state.timetable))
+
+
+if __name__ == '__main__':
+    unittest.main()
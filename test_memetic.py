@@ -0,0 +1,33 @@
+import unittest
+from memetic import MemeticAlgorithm
+from check_constraints import check_mandatory_constraints
+from test_sa import INPUT_FILE
+from orar import compile_input_file
+
+
+class TestMemeticAlgorithm(unittest.TestCase):
+    """The memetic search keeps the hard constraints and repeats a seeded run, in a process pool too"""
+
+    def setUp(self):
+        self.schedule_data = compile_input_file(INPUT_FILE)
+
+    def run_search(self, seed: int, workers: int = 1):
+        return MemeticAlgorithm.algorithm(self.schedule_data, seed=seed, population_size=6, generations=5,
+                                          workers=workers)
+
+    def test_valid_schedule(self):
+        state, cost, _ = self.run_search(5)
+        self.assertEqual(check_mandatory_constraints(state.timetable, self.schedule_data.specs), 0)
+        self.assertEqual(cost, state.evaluator.soft_cost)
+
+    def test_seeded_run_repeats(self):
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                first_state, first_cost, first_generations = self.run_search(5, workers)
+                second_state, second_cost, second_generations = self.run_search(5, workers)
+                self.assertEqual(first_state.timetable.cells, second_state.timetable.cells)
+                self.assertEqual((first_cost, first_generations), (second_cost, second_generations))
+
+
+if __name__ == '__main__':
+    unittest.main()
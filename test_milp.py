@@ -0,0 +1,34 @@
+import importlib.util
+import unittest
+from milp import MILP
+from check_constraints import check_mandatory_constraints, check_optional_constraints
+from test_csp import INPUT_FILE
+from orar import compile_input_file
+
+# the python package each backend needs, both optional
+BACKEND_PACKAGES = {'cpsat': 'ortools', 'cbc': 'pulp'}
+
+
+class TestMILP(unittest.TestCase):
+    """The integer program solved by every installed backend on a small input"""
+
+    def check_backend(self, solver: str):
+        if importlib.util.find_spec(BACKEND_PACKAGES[solver]) is None:
+            self.skipTest(f'{BACKEND_PACKAGES[solver]} is not installed')
+        schedule_data = compile_input_file(INPUT_FILE)
+        state, cost, lower_bound, optimal = MILP.algorithm(schedule_data, solver=solver)
+        self.assertIsNotNone(state)
+        self.assertTrue(optimal)
+        self.assertEqual(check_mandatory_constraints(state.timetable, schedule_data.specs), 0)
+        self.assertEqual(check_optional_constraints(state.timetable, schedule_data.specs), cost)
+        self.assertLessEqual(lower_bound, cost)
+
+    def test_cpsat(self):
+        self.check_backend('cpsat')
+
+    def test_cbc(self):
+        self.check_backend('cbc')
+
+
+if __name__ == '__main__':
+    unittest.main()
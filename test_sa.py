@@ -0,0 +1,46 @@
+import os
+import random
+import unittest
+from schedule import Schedule
+from sa import SimulatedAnnealing
+from budget import Budget
+from check_constraints import check_mandatory_constraints
+from test_evaluator import INPUT_FILES
+from orar import compile_input_file
+
+# the random initial states of this input still violate preferences, so the search has moves to make
+INPUT_FILE = [input_file for input_file in INPUT_FILES
+              if os.path.basename(input_file) == 'orar_constrans_incalcat.yaml'][0]
+
+
+def seeded_state(schedule_data, seed: int):
+    """Returns a random initial state built from the seed"""
+    state = Schedule(schedule_data, random.Random(seed))
+    state.create_state('random')
+    return state
+
+
+class TestSimulatedAnnealing(unittest.TestCase):
+    """Simulated annealing keeps the hard constraints and repeats a seeded run"""
+
+    def setUp(self):
+        self.schedule_data = compile_input_file(INPUT_FILE)
+
+    def run_search(self, seed: int):
+        state = seeded_state(self.schedule_data, seed)
+        return SimulatedAnnealing.algorithm(state, budget=Budget(max_evals=3000))
+
+    def test_valid_schedule(self):
+        state, cost, _ = self.run_search(3)
+        self.assertEqual(check_mandatory_constraints(state.timetable, self.schedule_data.specs), 0)
+        self.assertEqual(cost, state.evaluator.soft_cost)
+
+    def test_seeded_run_repeats(self):
+        first_state, first_cost, first_iterations = self.run_search(3)
+        second_state, second_cost, second_iterations = self.run_search(3)
+        self.assertEqual(first_state.timetable.cells, second_state.timetable.cells)
+        self.assertEqual((first_cost, first_iterations), (second_cost, second_iterations))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+from tabu import TabuSearch
+from budget import Budget
+from check_constraints import check_mandatory_constraints
+from test_sa import INPUT_FILE, seeded_state
+from orar import compile_input_file
+
+
+class TestTabuSearch(unittest.TestCase):
+    """Tabu search keeps the hard constraints and repeats a seeded run"""
+
+    def setUp(self):
+        self.schedule_data = compile_input_file(INPUT_FILE)
+
+    def run_search(self, seed: int):
+        state = seeded_state(self.schedule_data, seed)
+        return TabuSearch.algorithm(state, budget=Budget(max_evals=3000))
+
+    def test_valid_schedule(self):
+        state, cost, _ = self.run_search(3)
+        self.assertEqual(check_mandatory_constraints(state.timetable, self.schedule_data.specs), 0)
+        self.assertEqual(cost, state.evaluator.soft_cost)
+
+    def test_seeded_run_repeats(self):
+        first_state, first_cost, first_iterations = self.run_search(3)
+        second_state, second_cost, second_iterations = self.run_search(3)
+        self.assertEqual(first_state.timetable.cells, second_state.timetable.cells)
+        self.assertEqual((first_cost, first_iterations), (second_cost, second_iterations))
+
+
+if __name__ == '__main__':
+    unittest.main()
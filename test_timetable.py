@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+from timetable import Timetable, as_days_dict
+from utils import pretty_print_timetable
+from check_constraints import get_timetable, check_mandatory_constraints, check_optional_constraints
+from test_evaluator import INPUT_FILES, random_walk
+from orar import compile_input_file
+
+
+class TestTimetable(unittest.TestCase):
+    """The compact timetable against the legacy days dictionary"""
+
+    def test_dict_round_trip(self):
+        for input_file in INPUT_FILES:
+            schedule_data = compile_input_file(input_file)
+            for step, state in enumerate(random_walk(schedule_data, 4, 10)):
+                with self.subTest(input_file=os.path.basename(input_file), step=step):
+                    days = state.timetable.to_dict()
+                    self.assertEqual(Timetable.from_dict(days, schedule_data), state.timetable)
+                    # every classroom of every slot is in the dictionary, empty ones as None
+                    self.assertEqual(sum(len(classrooms) for intervals in days.values()
+                                         for classrooms in intervals.values()), len(state.timetable.cells))
+
+    def test_as_days_dict(self):
+        schedule_data = compile_input_file(INPUT_FILES[0])
+        state = next(random_walk(schedule_data, 5))
+        days = state.timetable.to_dict()
+        self.assertEqual(as_days_dict(state.timetable), days)
+        self.assertIs(as_days_dict(days), days)
+        # the checkers give the same counts for both forms
+        self.assertEqual(check_mandatory_constraints(state.timetable, schedule_data.specs),
+                         check_mandatory_constraints(days, schedule_data.specs))
+        self.assertEqual(check_optional_constraints(state.timetable, schedule_data.specs),
+                         check_optional_constraints(days, schedule_data.specs))
+
+    def test_output_file_round_trip(self):
+        for input_file in INPUT_FILES:
+            schedule_data = compile_input_file(input_file)
+            state = next(random_walk(schedule_data, 6))
+            with self.subTest(input_file=os.path.basename(input_file)), tempfile.TemporaryDirectory() as directory:
+                output_file = os.path.join(directory, 'output.txt')
+                with open(output_file, 'w') as file:
+                    file.write(pretty_print_timetable(state.timetable, schedule_data))
+                days = get_timetable(schedule_data.specs, output_file)
+                self.assertEqual(Timetable.from_dict(days, schedule_data), state.timetable)
+
+
+if __name__ == '__main__':
+    unittest.main()
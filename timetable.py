@@ -0,0 +1,131 @@
+from array import array
+from schedule_data import ScheduleData
+
+EMPTY = -1 # assignment id of a classroom slot with no course
+
+
+class Timetable:
+    """Compact timetable stored as a flat [day, interval, classroom] grid of assignment ids"""
+    def __init__(self, schedule_data: ScheduleData, cells: array = None, zobrist: int = None):
+        self.schedule_data = schedule_data
+        self.nr_days = len(schedule_data.day_names)
+        self.nr_intervals = len(schedule_data.interval_names)
+        self.nr_classrooms = len(schedule_data.classroom_names)
+        self.nr_courses = len(schedule_data.course_names)
+        if cells is None:
+            cells = array('i', [EMPTY]) * (self.nr_days * self.nr_intervals * self.nr_classrooms)
+        # assignment id = professor id * number of courses + course id
+        self.cells = cells
+        self.nr_assignments = len(schedule_data.professor_names) * self.nr_courses
+        # xor of the zobrist keys of the assigned cells, kept up to date by write
+        if zobrist is None:
+            zobrist = 0
+            for cell, assignment in enumerate(cells):
+                if assignment != EMPTY:
+                    zobrist ^= schedule_data.zobrist_keys[cell * self.nr_assignments + assignment]
+        self.zobrist = zobrist
+
+    def __eq__(self, other):
+        return self.zobrist == other.zobrist and self.cells == other.cells
+
+    def __hash__(self):
+        return self.zobrist
+
+    def copy(self):
+        """Returns a copy of the timetable sharing the same schedule data"""
+        return Timetable(self.schedule_data, array('i', self.cells), self.zobrist)
+
+    def cell(self, day: int, interval: int, classroom: int):
+        """Returns the index in the grid of a day, interval and classroom"""
+        return (day * self.nr_intervals + interval) * self.nr_classrooms + classroom
+
+    def slot(self, cell: int):
+        """Returns the day, interval and classroom of a cell"""
+        slot, classroom = divmod(cell, self.nr_classrooms)
+        day, interval = divmod(slot, self.nr_intervals)
+        return day, interval, classroom
+
+    def slot_cells(self, day: int, interval: int):
+        """Returns the cells of all classrooms in a day and interval"""
+        start = (day * self.nr_intervals + interval) * self.nr_classrooms
+        return range(start, start + self.nr_classrooms)
+
+    def get(self, cell: int):
+        """Returns the (professor id, course id) assigned to a cell or None"""
+        assignment = self.cells[cell]
+        if assignment == EMPTY:
+            return None
+        return divmod(assignment, self.nr_courses)
+
+    def write(self, cell: int, assignment: int):
+        """Stores an assignment id (or EMPTY) in a cell, updating the hash of the timetable"""
+        keys = self.schedule_data.zobrist_keys
+        old = self.cells[cell]
+        if old != EMPTY:
+            self.zobrist ^= keys[cell * self.nr_assignments + old]
+        if assignment != EMPTY:
+            self.zobrist ^= keys[cell * self.nr_assignments + assignment]
+        self.cells[cell] = assignment
+
+    def set(self, cell: int, professor: int, course: int):
+        """Assigns a professor and a course to a cell"""
+        self.write(cell, professor * self.nr_courses + course)
+
+    def clear(self, cell: int):
+        """Marks a cell as empty"""
+        self.write(cell, EMPTY)
+
+    def assignments(self):
+        """Yields (cell, professor id, course id) for every occupied cell"""
+        nr_courses = self.nr_courses
+        for cell, assignment in enumerate(self.cells):
+            if assignment != EMPTY:
+                professor, course = divmod(assignment, nr_courses)
+                yield cell, professor, course
+
+    def professor_in_interval(self, professor: int, day: int, interval: int):
+        """Checks if the professor is already teaching in an interval"""
+        nr_courses = self.nr_courses
+        for cell in self.slot_cells(day, interval):
+            assignment = self.cells[cell]
+            if assignment != EMPTY and assignment // nr_courses == professor:
+                return True
+        return False
+
+    def to_dict(self):
+        """Returns the legacy representation: day -> interval -> classroom -> (professor, course) or None"""
+        data = self.schedule_data
+        days = {}
+        for day, day_name in enumerate(data.day_names):
+            days[day_name] = {}
+            for interval, interval_name in enumerate(data.interval_names):
+                classrooms = {}
+                for classroom, cell in enumerate(self.slot_cells(day, interval)):
+                    assigned = self.get(cell)
+                    if assigned is not None:
+                        assigned = (data.professor_names[assigned[0]], data.course_names[assigned[1]])
+                    classrooms[data.classroom_names[classroom]] = assigned
+                days[day_name][interval_name] = classrooms
+        return days
+
+    @staticmethod
+    def from_dict(days: dict, schedule_data: ScheduleData):
+        """Builds a compact timetable from the legacy dictionary representation"""
+        timetable = Timetable(schedule_data)
+        for day_name in days:
+            for interval_name in days[day_name]:
+                for classroom_name, assigned in days[day_name][interval_name].items():
+                    if assigned:
+                        cell = timetable.cell(schedule_data.day_ids[day_name],
+                                              schedule_data.interval_ids[interval_name],
+                                              schedule_data.classroom_ids[classroom_name])
+                        timetable.set(cell, schedule_data.professor_ids[assigned[0]],
+                                      schedule_data.course_ids[assigned[1]])
+        return timetable
+
+
+def as_days_dict(timetable):
+    """Adapter accepting either a Timetable or the legacy days dictionary and returning the dictionary"""
+    if isinstance(timetable, Timetable):
+        return timetable.to_dict()
+    return timetable
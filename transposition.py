@@ -0,0 +1,47 @@
+from collections import OrderedDict
+
+ENTRY_BYTES = 220 # measured memory of an entry: zobrist hash key, tuple of costs and ordered dict links
+
+
+class TranspositionTable:
+    """Costs of the states already seen by a search, by zobrist hash, evicting the least recently used entries"""
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries # None for an unbounded table
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def with_memory(megabytes: float, value_bytes: int = 0):
+        """Returns a table holding at most the entries fitting in a memory budget, value_bytes more per entry"""
+        return TranspositionTable(max(1, int(megabytes * 2 ** 20) // (ENTRY_BYTES + value_bytes)))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key: int):
+        return key in self.entries
+
+    def lookup(self, key: int):
+        """Returns the value stored for a state, or None"""
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def store(self, key: int, value):
+        """Stores the value of a state, evicting the least recently used state when the table is full"""
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if self.max_entries is not None and len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def as_dict(self):
+        """Returns the counters of the table"""
+        return {'tt_entries': len(self.entries), 'tt_hits': self.hits, 'tt_misses': self.misses,
+                'tt_evictions': self.evictions}
@@ -1,6 +1,7 @@
 import yaml
 import argparse
 import sys
+from timetable import as_days_dict
 
 ##################### MACROURI #####################
 INTERVALE = 'Intervale'
@@ -89,6 +90,18 @@ def allign_string_with_spaces(s : str, max_len : int, allignment_type : str = 'c
     return s
 
 
+def get_timetable_specs(input_path) -> dict:
+    '''
+    Primește calea fișierului de intrare sau modelul compilat al problemei (ScheduleData)
+
+    Returnează specificațiile orarului, fără a reciti fișierul yaml când primește modelul compilat
+    '''
+
+    if isinstance(input_path, str):
+        return read_yaml_file(input_path)
+    return input_path.specs
+
+
 def pretty_print_timetable_aux_zile(timetable : {str : {(int, int) : {str : (str, str)}}}, input_path : str) -> str:
     '''
     Primește un dicționar ce are chei zilele, cu valori dicționare de intervale reprezentate ca tupluri de int-uri, cu valori dicționare de săli, cu valori tupluri (profesor, materie)
@@ -98,7 +111,7 @@ def pretty_print_timetable_aux_zile(timetable : {str : {(int, int) : {str : (str
 
     max_len = 30
 
-    profs = read_yaml_file(input_path)[PROFESORI].keys()
+    profs = get_timetable_specs(input_path)[PROFESORI].keys()
     profs_to_initials, _ = get_profs_initials(profs)
 
     table_str = '|           Interval           |             Luni             |             Marti            |           Miercuri           |              Joi             |            Vineri            |\n'
@@ -146,7 +159,7 @@ def pretty_print_timetable_aux_intervale(timetable : {(int, int) : {str : {str :
 
     max_len = 30
 
-    profs = read_yaml_file(input_path)[PROFESORI].keys()
+    profs = get_timetable_specs(input_path)[PROFESORI].keys()
     profs_to_initials, _ = get_profs_initials(profs)
 
     table_str = '|           Interval           |             Luni             |             Marti            |           Miercuri           |              Joi             |            Vineri            |\n'
@@ -187,7 +200,11 @@ def pretty_print_timetable(timetable : dict, input_path : str) -> str:
     fie un dictionar de intervale conținând dictionare de zile conținând dicționare de săli cu tupluri (profesor, materie)
     
     Pentru cazul în care o sală nu este ocupată la un moment de timp, se așteaptă 'None' în valoare, în loc de tuplu
+
+    Acceptă și un Timetable compact, care este convertit în dicționarul de zile, iar în locul căii
+    fișierului de intrare poate primi modelul compilat al problemei (ScheduleData)
     '''
+    timetable = as_days_dict(timetable)
     if 'Luni' in timetable:
         return pretty_print_timetable_aux_zile(timetable, input_path)
     else: